@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+# Add parent directory to path for importing data_pipeline
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from data_pipeline.cache import ProductCache
+from data_pipeline.database import DatabaseManager, Product, PriceHistory
+from monitoring.logging_setup import configure_logging
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ASIN_PATTERN = re.compile(r'^[A-Z0-9]{10}$')
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ProductAPI:
+    """Read-only product endpoints served through the Redis response cache.
+
+        GET /products?category=laptops&limit=50   latest products in a category
+        GET /products/<ASIN>                      one product
+        GET /top?category=laptops&by=rating|price&order=desc&limit=10
+        GET /history/<ASIN>?days=30               price history
+        GET /health
+    """
+
+    def __init__(self, db_manager=None, cache=None):
+        self.db_manager = db_manager or DatabaseManager()
+        self.cache = cache or ProductCache()
+        self.max_limit = int(os.getenv('API_MAX_LIMIT', '500'))
+
+    def _limit(self, params, default):
+        try:
+            limit = int(params.get('limit', default))
+        except ValueError:
+            raise APIError(400, "limit must be an integer")
+        return max(1, min(limit, self.max_limit))
+
+    @staticmethod
+    def _asin(value):
+        if not ASIN_PATTERN.match(value or ''):
+            raise APIError(400, f"Invalid ASIN: {value}")
+        return value
+
+    def resolve(self, path, params):
+        """Map a request to (handler, cache scopes)"""
+        parts = [part for part in path.split('/') if part]
+        if parts == ['products']:
+            category = params.get('category')
+            return (lambda: self.latest_products(category, self._limit(params, 50)),
+                    [f"category:{category}"] if category else ['all'])
+        if len(parts) == 2 and parts[0] == 'products':
+            asin = self._asin(parts[1])
+            return lambda: self.product(asin), [f"asin:{asin}"]
+        if parts == ['top']:
+            category = params.get('category')
+            by = params.get('by', 'rating')
+            order = params.get('order', 'desc')
+            if by not in ('rating', 'price') or order not in ('asc', 'desc'):
+                raise APIError(400, "by must be rating or price and order asc or desc")
+            return (lambda: self.top_products(category, by, order, self._limit(params, 10)),
+                    [f"category:{category}"] if category else ['all'])
+        if len(parts) == 2 and parts[0] == 'history':
+            asin = self._asin(parts[1])
+            try:
+                days = int(params.get('days', 30))
+            except ValueError:
+                raise APIError(400, "days must be an integer")
+            return lambda: self.price_history(asin, days), [f"asin:{asin}"]
+        raise APIError(404, f"Not found: {path}")
+
+    def latest_products(self, category, limit):
+        session = self.db_manager.get_session()
+        try:
+            query = session.query(Product)
+            if category:
+                query = query.filter(Product.category == category)
+            products = query.order_by(Product.scraped_at.desc()).limit(limit).all()
+            return {'category': category, 'products': [product.to_dict() for product in products]}
+        finally:
+            session.close()
+
+    def product(self, asin):
+        session = self.db_manager.get_session()
+        try:
+            product = (session.query(Product).filter(Product.asin == asin)
+                       .order_by(Product.scraped_at.desc()).first())
+            if product is None:
+                raise APIError(404, f"No product with ASIN {asin}")
+            return product.to_dict()
+        finally:
+            session.close()
+
+    def top_products(self, category, by, order, limit):
+        session = self.db_manager.get_session()
+        try:
+            query = session.query(Product)
+            if category:
+                query = query.filter(Product.category == category)
+            if by == 'rating':
+                rating = Product.rating.desc() if order == 'desc' else Product.rating.asc()
+                products = (query.filter(Product.rating.isnot(None))
+                            .order_by(rating, Product.num_reviews.desc()).limit(limit).all())
+                items = [product.to_dict() for product in products]
+            else:
+                price = Product.price_value.desc() if order == 'desc' else Product.price_value.asc()
+                products = (query.filter(Product.price_value.isnot(None))
+                            .order_by(price, Product.id).limit(limit).all())
+                items = [dict(product.to_dict(), price_value=product.price_value) for product in products]
+            return {'category': category, 'by': by, 'order': order, 'products': items}
+        finally:
+            session.close()
+
+    def price_history(self, asin, days):
+        session = self.db_manager.get_session()
+        try:
+            since = datetime.utcnow() - timedelta(days=days)
+            rows = (session.query(PriceHistory)
+                    .filter(PriceHistory.asin == asin, PriceHistory.scraped_at >= since)
+                    .order_by(PriceHistory.scraped_at).all())
+            return {'asin': asin, 'days': days, 'history': [
+                {'price': row.price, 'rating': row.rating, 'num_reviews': row.num_reviews,
+                 'scraped_at': row.scraped_at.isoformat()}
+                for row in rows
+            ]}
+        finally:
+            session.close()
+
+    def handle(self, raw_path, if_none_match=None):
+        """Serve a GET; returns (status, body bytes, headers)"""
+        parsed = urlparse(raw_path)
+        params = dict(parse_qsl(parsed.query))
+        if parsed.path.rstrip('/') == '/health':
+            return 200, b'{"status": "ok"}', {}
+
+        try:
+            handler, scopes = self.resolve(parsed.path, params)
+        except APIError as e:
+            return e.status, json.dumps({'error': str(e)}).encode('utf-8'), {}
+
+        # Same response whatever order the query parameters come in
+        normalized = f"{parsed.path}?{urlencode(sorted(params.items()))}"
+        key = cached = None
+        try:
+            key = self.cache.cache_key(normalized, scopes)
+            cached = self.cache.get(key)
+        except Exception as e:
+            logger.warning("API cache unavailable: %s", e)
+
+        if cached is not None:
+            body, etag = cached
+            headers = {'ETag': etag, 'X-Cache': 'HIT'}
+        else:
+            try:
+                payload = handler()
+            except APIError as e:
+                return e.status, json.dumps({'error': str(e)}).encode('utf-8'), {}
+            body = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+            etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+            headers = {'ETag': etag, 'X-Cache': 'MISS'}
+            if key is not None:
+                try:
+                    self.cache.set(key, body, etag)
+                except Exception as e:
+                    logger.warning("Failed to cache %s: %s", normalized, e)
+
+        headers['Cache-Control'] = 'no-cache'
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, b'', headers
+        return 200, body, headers
+
+def make_server(api=None, host=None, port=None):
+    api = api or ProductAPI()
+    host = host or os.getenv('API_HOST', '0.0.0.0')
+    port = int(port if port is not None else os.getenv('API_PORT', '8090'))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body, headers = api.handle(self.path, self.headers.get('If-None-Match'))
+            self.send_response(status)
+            if status != 304:
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == "__main__":
+    configure_logging()
+    server = make_server()
+    host, port = server.server_address[:2]
+    print(f"Product API serving on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
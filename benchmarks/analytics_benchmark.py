@@ -0,0 +1,146 @@
+"""Vectorized category analytics against the naive row-by-row approach.
+
+Fills a throwaway SQLite database with synthetic price history, then times
+computing per-category percentiles, review-weighted ratings and
+day-over-day moves by looping over row dicts versus CategoryAnalytics, and
+an incremental update() for one new day versus a full reload.
+
+    python benchmarks/analytics_benchmark.py --products 20000 --days 14
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+def generate_history(db_manager, products, days, categories, start_day=0):
+    """Insert one observation per product per day, prices following a random walk"""
+    from sqlalchemy import insert
+    from data_pipeline.database import PriceHistory
+
+    rng = np.random.default_rng(0)
+    base_price = rng.lognormal(8, 1, products)
+    category = rng.integers(0, categories, products)
+    rating = np.round(rng.uniform(1, 5, products), 1)
+    start = datetime(2024, 1, 1)
+
+    log_walk = np.zeros(products)
+    with db_manager.engine.begin() as conn:
+        for day in range(start_day + days):
+            # Same steps every call, so a later batch continues the walk
+            day_rng = np.random.default_rng(day + 1)
+            log_walk += day_rng.normal(0, 0.03, products)
+            if day < start_day:
+                continue
+            price = np.round(base_price * np.exp(log_walk), 0)
+            reviews = day_rng.integers(0, 20000, products)
+            scraped_at = start + timedelta(days=day, hours=int(day_rng.integers(0, 23)))
+            conn.execute(insert(PriceHistory), [
+                {'url': f"https://www.amazon.in/dp/B{i:09d}", 'category': f"category{category[i]}",
+                 'price': float(price[i]), 'rating': float(rating[i]), 'num_reviews': int(reviews[i]),
+                 'scraped_at': scraped_at}
+                for i in range(products)
+            ])
+
+def naive_stats(db_manager):
+    """The row-by-row way: ORM rows to dicts, then Python loops per category"""
+    from data_pipeline.database import PriceHistory
+
+    session = db_manager.get_session()
+    try:
+        rows = [{'url': row.url, 'category': row.category, 'price': row.price, 'rating': row.rating,
+                 'num_reviews': row.num_reviews, 'scraped_at': row.scraped_at}
+                for row in session.query(PriceHistory).all()]
+    finally:
+        session.close()
+
+    # Last observation per product per day
+    by_product = {}
+    for row in sorted(rows, key=lambda row: row['scraped_at']):
+        by_product.setdefault(row['url'], {})[row['scraped_at'].date()] = row
+
+    by_category = {}
+    for days in by_product.values():
+        ordered = [days[day] for day in sorted(days)]
+        latest = ordered[-1]
+        previous = ordered[-2] if len(ordered) > 1 else None
+        by_category.setdefault(latest['category'], []).append((latest, previous))
+
+    stats = {}
+    for category, items in by_category.items():
+        prices = [latest['price'] for latest, _ in items if latest['price'] is not None]
+        quantiles = statistics.quantiles(prices, n=100, method='inclusive')
+        weights = [(latest['rating'], latest['num_reviews']) for latest, _ in items
+                   if latest['rating'] is not None and latest['num_reviews'] is not None]
+        changes = [(latest['price'] - previous['price']) / previous['price'] for latest, previous in items
+                   if previous and previous['price']]
+        stats[category] = {
+            'p50': quantiles[49],
+            'p90': quantiles[89],
+            'review_weighted_rating': sum(r * w for r, w in weights) / sum(w for _, w in weights),
+            'mean_change': sum(changes) / len(changes) if changes else None,
+        }
+    return stats
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized analytics against row-by-row loops")
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--categories', type=int, default=10)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='scraper-analytics-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp_dir, 'analytics.db')}"
+    from data_pipeline.database import DatabaseManager
+    from data_pipeline.analytics import CategoryAnalytics
+
+    try:
+        db_manager = DatabaseManager()
+        db_manager.create_tables()
+        print(f"Generating {args.products * args.days} rows...")
+        generate_history(db_manager, args.products, args.days, args.categories)
+
+        naive, naive_time = timed(lambda: naive_stats(db_manager))
+        analytics = CategoryAnalytics(db_manager)
+        _, load_time = timed(analytics.refresh)
+        vectorized, stats_time = timed(analytics.stats)
+        flagged, anomaly_time = timed(analytics.anomalies)
+
+        # Both must agree before the timings mean anything
+        for category, expected in naive.items():
+            got = vectorized[category]
+            assert abs(got['percentiles']['p50'] - expected['p50']) < 1e-6, category
+            assert abs(got['percentiles']['p90'] - expected['p90']) < 1e-6, category
+            assert abs(got['review_weighted_rating'] - expected['review_weighted_rating']) < 1e-3, category
+            assert abs(got['mean_change'] - expected['mean_change']) < 1e-3, category
+
+        generate_history(db_manager, args.products, 1, args.categories, start_day=args.days)
+        loaded, update_time = timed(analytics.update)
+        reloaded = CategoryAnalytics(db_manager)
+        _, reload_time = timed(reloaded.refresh)
+        assert analytics.stats() == reloaded.stats(), "incremental update diverged from a full reload"
+
+        print(f"\nRow-by-row:             {naive_time:8.3f}s")
+        print(f"Vectorized load:        {load_time:8.3f}s")
+        print(f"Vectorized stats:       {stats_time:8.3f}s ({naive_time / (load_time + stats_time):.1f}x faster end to end)")
+        print(f"Anomaly flags:          {anomaly_time:8.3f}s ({len(flagged)} flagged)")
+        print(f"Incremental update:     {update_time:8.3f}s for {loaded} new rows")
+        print(f"Full reload:            {reload_time:8.3f}s")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Load test for the product read API.
+
+Starts the API in-process against DATABASE_URL and REDIS_URL (local
+Postgres and Redis from docker-compose), optionally seeds synthetic
+products, and hammers a mix of endpoints from concurrent clients. A share
+of requests revalidate with If-None-Match, and a writer thread can keep
+saving products so cache invalidation is exercised under load. Reports
+requests/s, latency percentiles, status codes and the cache hit ratio.
+
+    python benchmarks/api_load_test.py --seed 2000 --concurrency 16 --duration 30
+    python benchmarks/api_load_test.py --url http://localhost:8090 --write-interval 1
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+CATEGORIES = ['laptops', 'smartphones', 'headphones', 'tablets', 'cameras']
+
+def synthetic_products(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        yield category, {
+            'name': f"{category.title()} load test product {i}",
+            'url': f"https://www.amazon.in/load-test-{i}/dp/L{i:09d}",
+            'price': f"₹{rng.randint(499, 99999):,}",
+            'rating': f"{rng.uniform(1, 5):.1f}",
+            'num_reviews': str(rng.randint(0, 20000)),
+        }
+
+def seed_products(db_manager, count):
+    by_category = {}
+    for category, product in synthetic_products(count):
+        by_category.setdefault(category, []).append(product)
+    for category, products in by_category.items():
+        db_manager.save_products(products, category=category)
+
+def random_path(rng, asin_count):
+    category = rng.choice(CATEGORIES)
+    asin = f"L{rng.randrange(max(asin_count, 1)):09d}"
+    return rng.choice([
+        f"/products?category={category}&limit=50",
+        f"/products/{asin}",
+        f"/top?category={category}&by=rating&limit=10",
+        f"/top?category={category}&by=price&order=asc&limit=10",
+        f"/history/{asin}?days=30",
+    ])
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.cache = {}
+        self._lock = threading.Lock()
+
+    def record(self, latency, status, cache):
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if cache:
+                self.cache[cache] = self.cache.get(cache, 0) + 1
+
+def client(base_url, deadline, results, asin_count, revalidate, seed):
+    rng = random.Random(seed)
+    etags = {}
+    while time.time() < deadline:
+        path = random_path(rng, asin_count)
+        request = urllib.request.Request(base_url + path)
+        if path in etags and rng.random() < revalidate:
+            request.add_header('If-None-Match', etags[path])
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                status, headers = response.status, response.headers
+        except urllib.error.HTTPError as e:
+            status, headers = e.code, e.headers
+        except Exception:
+            status, headers = 'error', {}
+        results.record(time.perf_counter() - start, status, headers.get('X-Cache'))
+        if headers.get('ETag'):
+            etags[path] = headers['ETag']
+
+def writer(db_manager, deadline, interval, count):
+    """Keep re-saving random products so their cache scopes are invalidated"""
+    rng = random.Random(1)
+    products = list(synthetic_products(count))
+    while time.time() < deadline:
+        category, product = rng.choice(products)
+        db_manager.save_products([dict(product, price=f"₹{rng.randint(499, 99999):,}")], category=category)
+        time.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the product read API")
+    parser.add_argument('--url', help="Test a running API instead of starting one in-process")
+    parser.add_argument('--seed', type=int, default=0, help="Synthetic products to save before the test")
+    parser.add_argument('--products', type=int, default=2000, help="ASIN range requested (L000000000...)")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--revalidate', type=float, default=0.3, help="Share of repeat requests sent with If-None-Match")
+    parser.add_argument('--write-interval', type=float, default=0, help="Seconds between background saves (0 disables)")
+    args = parser.parse_args()
+
+    from data_pipeline.database import DatabaseManager
+    from monitoring.slo import percentile
+
+    db_manager = DatabaseManager()
+    db_manager.create_tables()
+    if args.seed:
+        print(f"Seeding {args.seed} products...")
+        seed_products(db_manager, args.seed)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        from api.server import make_server
+        server = make_server(host='127.0.0.1', port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    base_url = base_url.rstrip('/')
+
+    results = Results()
+    deadline = time.time() + args.duration
+    threads = [threading.Thread(target=client, args=(base_url, deadline, results, args.products, args.revalidate, n))
+               for n in range(args.concurrency)]
+    if args.write_interval:
+        threads.append(threading.Thread(target=writer,
+                                        args=(db_manager, deadline, args.write_interval, args.products)))
+
+    print(f"Load testing {base_url} with {args.concurrency} clients for {args.duration:.0f}s...")
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    if server is not None:
+        server.shutdown()
+
+    total = len(results.latencies)
+    if not total:
+        print("No requests completed")
+        return
+    hits, misses = results.cache.get('HIT', 0), results.cache.get('MISS', 0)
+    print(f"\nRequests: {total} ({total / elapsed:.1f}/s)")
+    print(f"Latency p50 {percentile(results.latencies, 50) * 1000:.1f}ms, "
+          f"p95 {percentile(results.latencies, 95) * 1000:.1f}ms, "
+          f"p99 {percentile(results.latencies, 99) * 1000:.1f}ms")
+    print(f"Status codes: {results.statuses}")
+    if hits + misses:
+        print(f"Cache hit ratio: {hits / (hits + misses):.1%} ({hits} hits, {misses} misses)")
+
+if __name__ == "__main__":
+    main()
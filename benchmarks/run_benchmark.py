@@ -0,0 +1,267 @@
+"""End-to-end crawl benchmark against a local mock storefront.
+
+Queues category jobs for the mock storefront, runs real queue workers
+(Playwright fetch, parser, database upserts, Redis queue) until every job
+has finished, and reports throughput, per-stage latency percentiles and
+peak RSS. With --baseline the run is compared against stored results and
+the exit code is 1 if anything regressed by more than --tolerance.
+
+    python benchmarks/run_benchmark.py --categories 4 --pages 5
+    python benchmarks/run_benchmark.py --save-baseline
+    python benchmarks/run_benchmark.py --error-rate 0.05 --block-rate 0.02 --workers 2
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path[:0] = [ROOT_DIR, os.path.join(ROOT_DIR, 'crawler')]
+
+from storefront import MockStorefront
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+# Reported stages, in pipeline order
+STAGES = ('queue_wait', 'browser_launch', 'navigation', 'readiness_wait', 'page_content',
+          'parse', 'db_lookup', 'db_upsert', 'job')
+# Compared against the baseline: (path into the report, True if higher is better)
+COMPARED = [('pages_per_second', True), ('products_per_second', True), ('peak_rss_mb', False)] + \
+           [(f'stages.{stage}.p95', False) for stage in ('navigation', 'parse', 'db_upsert', 'job')]
+
+def configure_environment(args, run_id):
+    """Point the pipeline at local services before any of it is imported"""
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ['SCRAPING_QUEUE_NAME'] = f"benchmark:{run_id}:jobs"
+    os.environ['RESULTS_QUEUE_NAME'] = f"benchmark:{run_id}:results"
+    os.environ['RATE_LIMIT_RATE'] = str(args.rate)
+    os.environ['RATE_LIMIT_BURST'] = str(max(args.rate, 1))
+    os.environ['WORKER_POLL_TIMEOUT'] = '1'
+    os.environ['PARENT_JOB_TTL'] = '3600'
+    # Everything runs in this process, so metrics stay in memory
+    os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    # Never page anyone about a benchmark
+    for flag in ('ENABLE_EMAIL_ALERTS', 'ENABLE_SLACK_NOTIFICATIONS', 'ENABLE_DISCORD_NOTIFICATIONS'):
+        os.environ[flag] = 'false'
+    if args.redis_url:
+        os.environ['REDIS_URL'] = args.redis_url
+
+class StageRecorder:
+    """Metrics listener that keeps every stage timing and page result of the run"""
+
+    def __init__(self):
+        self.stages = {}
+        self.fetches = {}
+        self.pages = 0
+        self.products = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, event, **fields):
+        with self._lock:
+            if event == 'stage':
+                self.stages.setdefault(fields['stage'], []).append(fields['duration'])
+            elif event == 'fetch':
+                self.fetches[fields['outcome']] = self.fetches.get(fields['outcome'], 0) + 1
+            elif event == 'page':
+                self.pages += 1
+                self.products += fields['products']
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its reaped children (browsers)"""
+    # ru_maxrss is in KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return round(own, 1), round(children, 1)
+
+def run_workers(args, run_id, storefront, recorder):
+    from data_pipeline.database import DatabaseManager
+    from data_pipeline.queue import QueueManager
+    from monitoring.metrics import metrics
+    from scraper import scrape_with_queue
+    from session_manager import BrowserSession
+
+    metrics.add_listener(recorder)
+    DatabaseManager().create_tables()
+    queue_manager = QueueManager()
+
+    parent_ids = []
+    for i in range(args.categories):
+        parent_id = queue_manager.add_category_job({
+            'category': f"bench{i}",
+            # The run ID keeps the frontier from treating pages as already fetched
+            'url': f"{storefront.url}/s?k=bench{i}&run={run_id}",
+            'max_pages': args.pages,
+        })
+        if parent_id:
+            parent_ids.append(parent_id)
+
+    stop_event = threading.Event()
+
+    def worker():
+        with BrowserSession() as session:
+            scrape_with_queue(QueueManager(), DatabaseManager(), stop_event=stop_event, session=session)
+
+    started = time.time()
+    threads = [threading.Thread(target=worker, name=f"benchmark-worker-{n}") for n in range(args.workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        pending = set(parent_ids)
+        deadline = started + args.timeout
+        while pending and time.time() < deadline:
+            time.sleep(0.2)
+            for parent_id in list(pending):
+                status = queue_manager.get_parent_status(parent_id)
+                if status is None or 'finalized' in status:
+                    pending.discard(parent_id)
+        duration = time.time() - started
+        if pending:
+            print(f"Timed out with {len(pending)} jobs unfinished")
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+        queue_manager.clear_queue()
+        queue_manager.redis_client.delete(queue_manager.results_queue,
+                                          *[queue_manager.parent_prefix + parent_id for parent_id in parent_ids])
+
+    return duration, len(parent_ids) - len(pending)
+
+def build_report(args, duration, jobs_done, recorder, storefront):
+    def summarize(durations):
+        from monitoring.slo import percentile
+        return {
+            'count': len(durations),
+            'p50': round(percentile(durations, 50), 4),
+            'p95': round(percentile(durations, 95), 4),
+            'p99': round(percentile(durations, 99), 4),
+        }
+
+    own_rss, children_rss = peak_rss_mb()
+    return {
+        'config': {
+            'categories': args.categories, 'pages': args.pages, 'workers': args.workers,
+            'latency': args.latency, 'error_rate': args.error_rate, 'block_rate': args.block_rate,
+            'database': args.database_url.split(':', 1)[0],
+        },
+        'timestamp': time.time(),
+        'duration': round(duration, 2),
+        'jobs_done': jobs_done,
+        'pages': recorder.pages,
+        'products': recorder.products,
+        'pages_per_second': round(recorder.pages / duration, 3) if duration else 0,
+        'products_per_second': round(recorder.products / duration, 2) if duration else 0,
+        'fetches': recorder.fetches,
+        'storefront_requests': storefront.requests,
+        'stages': {stage: summarize(recorder.stages[stage]) for stage in STAGES if recorder.stages.get(stage)},
+        'peak_rss_mb': own_rss,
+        'peak_rss_children_mb': children_rss,
+    }
+
+def _lookup(report, path):
+    value = report
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+def compare(report, baseline, tolerance):
+    """Print each compared metric next to the baseline; return the regressions"""
+    if baseline.get('config') != report['config']:
+        print(f"Warning: baseline was recorded with a different config: {baseline.get('config')}")
+
+    regressions = []
+    print(f"\n{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+    for path, higher_is_better in COMPARED:
+        old, new = _lookup(baseline, path), _lookup(report, path)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        print(f"{path:<28}{old:>12}{new:>12}{change:>+10.1%}{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(path)
+    return regressions
+
+def print_report(report):
+    print(f"\n=== Benchmark: {report['config']} ===")
+    print(f"Jobs finished: {report['jobs_done']} in {report['duration']}s")
+    print(f"Pages: {report['pages']} ({report['pages_per_second']}/s), "
+          f"products: {report['products']} ({report['products_per_second']}/s)")
+    print(f"Fetch outcomes: {report['fetches']}; storefront served: {report['storefront_requests']}")
+    print(f"Peak RSS: {report['peak_rss_mb']} MB (browsers: {report['peak_rss_children_mb']} MB)")
+    print(f"\n{'stage':<16}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, summary in report['stages'].items():
+        print(f"{stage:<16}{summary['count']:>8}{summary['p50']:>10.4f}{summary['p95']:>10.4f}{summary['p99']:>10.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crawl pipeline against a mock storefront")
+    parser.add_argument('--categories', type=int, default=4, help="Category jobs to queue")
+    parser.add_argument('--pages', type=int, default=5, help="Pages per category")
+    parser.add_argument('--workers', type=int, default=1, help="Queue worker threads, each with its own browser")
+    parser.add_argument('--latency', type=float, default=0.05, help="Storefront response latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with a 503")
+    parser.add_argument('--block-rate', type=float, default=0.0, help="Share of requests answered with a captcha")
+    parser.add_argument('--pages-dir', help="Serve recorded search page .html files instead of synthetic ones")
+    parser.add_argument('--rate', type=float, default=100.0, help="Rate limit for the storefront host, pages/s")
+    parser.add_argument('--database-url', help="Defaults to a throwaway SQLite database")
+    parser.add_argument('--redis-url', help="Defaults to REDIS_URL")
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument('--output', help="Write the report JSON here")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if not args.database_url:
+        tmp_dir = tempfile.mkdtemp(prefix='scraper-benchmark-')
+        args.database_url = f"sqlite:///{os.path.join(tmp_dir, 'benchmark.db')}"
+
+    run_id = uuid.uuid4().hex[:8]
+    configure_environment(args, run_id)
+
+    storefront = MockStorefront(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                block_rate=args.block_rate, last_page=args.pages, pages_dir=args.pages_dir).start()
+    recorder = StageRecorder()
+    try:
+        duration, jobs_done = run_workers(args, run_id, storefront, recorder)
+    finally:
+        storefront.stop()
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    report = build_report(args, duration, jobs_done, recorder, storefront)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nRegressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions against the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import argparse
+import glob
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+BLOCK_PAGE = """<html><head><title>Amazon.in</title></head><body>
+<form method="get" action="/errors/validateCaptcha">
+<h4>Enter the characters you see below</h4>
+<p>Sorry, we just need to make sure you're not a robot.</p>
+<p>To discuss automated access to Amazon data please contact api-services-support@amazon.com.</p>
+</form></body></html>"""
+
+PRODUCT_TEMPLATE = """<div data-component-type="s-search-result" data-asin="{asin}" class="s-result-item">
+  <div class="a-section">
+    <h2 class="a-size-mini"><a class="a-link-normal" href="/{slug}/dp/{asin}/ref=sr_1_{position}">
+      <span class="a-size-medium a-text-normal">{name}</span></a></h2>
+    <div class="a-row a-size-small">
+      <span aria-label="{rating} out of 5 stars"><i class="a-icon a-icon-star-small">
+        <span class="a-icon-alt">{rating} out of 5 stars</span></i></span>
+      <span aria-label="{reviews} ratings"><span class="a-size-base s-underline-text">{reviews}</span></span>
+    </div>
+    <div class="a-row"><a class="a-link-normal" href="/{slug}/dp/{asin}/ref=sr_1_{position}">
+      <span class="a-price"><span class="a-offscreen">&#8377;{price}</span>
+        <span aria-hidden="true"><span class="a-price-symbol">&#8377;</span><span class="a-price-whole">{price}</span></span>
+      </span></a></div>
+  </div>
+</div>"""
+
+def render_search_page(query, page, last_page, per_page=48):
+    """Synthetic search results page with the markup the parser reads.
+
+    Products are deterministic for a (query, page) so repeated runs store
+    the same rows; the result banner and pagination strip match the real
+    site so early-stop pagination behaves as it would in production.
+    """
+    rng = random.Random(f"{query}:{page}")
+    items = []
+    for position in range(1, per_page + 1):
+        index = (page - 1) * per_page + position
+        name = f"{query.title()} Model {index} with {rng.choice(['8GB', '16GB', '32GB'])} RAM and Long Battery Life"
+        items.append(PRODUCT_TEMPLATE.format(
+            asin=f"B0{zlib.crc32(f'{query}:{index}'.encode()) % 10 ** 8:08d}",
+            slug=name.replace(' ', '-')[:60],
+            position=position,
+            name=name,
+            rating=f"{rng.uniform(3, 5):.1f}",
+            reviews=f"{rng.randint(1, 20000):,}",
+            price=f"{rng.randint(499, 99999):,}",
+        ))
+
+    first = (page - 1) * per_page + 1
+    banner = (f'<div data-component-type="s-result-info-bar"><span>{first}-{first + per_page - 1} of '
+              f'{last_page * per_page:,} results for "{query}"</span></div>')
+    pages = ''.join(
+        f'<span class="s-pagination-item s-pagination-selected">{n}</span>' if n == page
+        else f'<a class="s-pagination-item s-pagination-button" href="/s?k={query}&page={n}">{n}</a>'
+        for n in range(max(1, page - 2), min(last_page, page + 2) + 1)
+    )
+    next_class = 's-pagination-item s-pagination-next' + (' s-pagination-disabled' if page >= last_page else '')
+    strip = f'<div class="s-pagination-strip">{pages}<span class="{next_class}">Next</span></div>'
+
+    # Real pages carry a lot of markup around the results; pad to a similar size
+    filler = '<div class="a-section s-widget">' + ('<span class="a-size-base">&nbsp;</span>' * 40) + '</div>'
+    return (f"<html><head><title>Amazon.in : {query}</title></head><body>{banner}"
+            f"<div class=\"s-main-slot s-result-list\">{''.join(items)}</div>{filler * 50}{strip}</body></html>")
+
+class MockStorefront:
+    """Local HTTP server standing in for the storefront during benchmarks.
+
+    Serves /s?k=<query>&page=<n> either from recorded HTML files (cycled by
+    page number) or from synthetic pages, after `latency` +/- `jitter`
+    seconds. A share of requests fail with a 503 (`error_rate`) or get a
+    captcha page (`block_rate`), so retries and block handling are part of
+    what is measured.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, jitter=0.02, error_rate=0.0, block_rate=0.0,
+                 last_page=20, pages_dir=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.block_rate = block_rate
+        self.last_page = last_page
+        self.recorded = []
+        if pages_dir:
+            for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+                with open(path, encoding='utf-8') as f:
+                    self.recorded.append(f.read())
+        self.rng = random.Random(seed)
+        self.requests = {'ok': 0, 'error': 0, 'blocked': 0}
+        self._lock = threading.Lock()
+        self._cache = {}
+
+        storefront = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                storefront.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _page(self, query, page):
+        if self.recorded:
+            return self.recorded[(page - 1) % len(self.recorded)]
+        key = (query, page)
+        if key not in self._cache:
+            self._cache[key] = render_search_page(query, page, self.last_page)
+        return self._cache[key]
+
+    def handle(self, request):
+        parsed = urlparse(request.path)
+        params = parse_qs(parsed.query)
+        query = params.get('k', ['item'])[0]
+        page = int(params.get('page', ['1'])[0])
+
+        with self._lock:
+            roll = self.rng.random()
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+
+        if parsed.path != '/s':
+            status, body, outcome = 404, '<html><body>Not found</body></html>', 'error'
+        elif roll < self.error_rate:
+            status, body, outcome = 503, '<html><body>Service Unavailable</body></html>', 'error'
+        elif roll < self.error_rate + self.block_rate:
+            status, body, outcome = 200, BLOCK_PAGE, 'blocked'
+        else:
+            status, body, outcome = 200, self._page(query, page), 'ok'
+
+        with self._lock:
+            self.requests[outcome] += 1
+
+        payload = body.encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', 'text/html; charset=utf-8')
+        request.send_header('Content-Length', str(len(payload)))
+        request.end_headers()
+        request.wfile.write(payload)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='mock-storefront', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve mock search pages for benchmarking")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--block-rate', type=float, default=0.0)
+    parser.add_argument('--last-page', type=int, default=20)
+    parser.add_argument('--pages-dir', help="Directory of recorded search page .html files")
+    args = parser.parse_args()
+
+    storefront = MockStorefront(port=args.port, latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, block_rate=args.block_rate,
+                                last_page=args.last_page, pages_dir=args.pages_dir)
+    print(f"Mock storefront serving on {storefront.url}/s?k=laptop")
+    try:
+        storefront.server.serve_forever()
+    except KeyboardInterrupt:
+        storefront.stop()
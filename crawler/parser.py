@@ -1,43 +1,113 @@
 from bs4 import BeautifulSoup
+import logging
+import math
+import re
+from monitoring.logging_setup import debug_enabled, log_debug
+
+logger = logging.getLogger(__name__)
+
+RESULT_COUNT_PATTERN = re.compile(r'(\d[\d,]*)\s*-\s*(\d[\d,]*)\s+of\s+(over\s+)?(\d[\d,]*)\s+results')
+# Markers of Amazon's captcha / robot check pages
+BLOCK_MARKERS = (
+    '/errors/validateCaptcha',
+    'Enter the characters you see below',
+    'api-services-support@amazon.com',
+    'To discuss automated access to Amazon data',
+)
 
 def parse_search_results(html):
+    """Parse the products on a search results page"""
+    return parse_search_page(html)[0]
+
+def is_blocked_page(html):
+    """Whether the HTML is a captcha or robot check instead of real content"""
+    return any(marker in html for marker in BLOCK_MARKERS)
+
+def parse_search_page(html):
+    """Parse the products and pagination info from a search results page"""
     soup = BeautifulSoup(html, "html.parser")
+    try:
+        return _parse_products(soup), parse_page_info(soup)
+    finally:
+        # Break the tree's reference cycles so it is freed right away
+        soup.decompose()
+
+def parse_page_info(soup):
+    """Work out where this page sits in the result set.
+
+    Uses the "1-48 of 1,234 results" banner and the pagination strip; any
+    value that can't be found is None. The strip wins where both give a
+    value.
+    """
+    info = {'current_page': None, 'last_page': None, 'total_results': None, 'has_next': None}
+    
+    # Pagination strip
+    strip = soup.select_one('.s-pagination-strip')
+    selected_page = None
+    page_numbers = []
+    if strip:
+        selected = strip.select_one('.s-pagination-selected')
+        if selected and selected.get_text(strip=True).isdigit():
+            selected_page = int(selected.get_text(strip=True))
+        page_numbers = [int(item.get_text(strip=True)) for item in strip.select('.s-pagination-item')
+                        if item.get_text(strip=True).isdigit()]
+        next_link = strip.select_one('.s-pagination-next')
+        if next_link is not None:
+            info['has_next'] = 's-pagination-disabled' not in (next_link.get('class') or [])
+    
+    # Result count banner, e.g. "49-96 of over 10,000 results for"
+    banner = soup.select_one('[data-component-type="s-result-info-bar"]')
+    match = RESULT_COUNT_PATTERN.search(banner.get_text(" ", strip=True)) if banner else None
+    if match:
+        first, last, over, total = match.groups()
+        first, last, total = (int(value.replace(',', '')) for value in (first, last, total))
+        # The page size only shows on a full page; the last one may be short
+        per_page = None
+        if selected_page and selected_page > 1:
+            if (first - 1) % (selected_page - 1) == 0:
+                per_page = (first - 1) // (selected_page - 1)
+        elif first == 1 or over or last < total:
+            per_page = last - first + 1
+        if per_page and per_page > 0:
+            info['current_page'] = (first - 1) // per_page + 1
+        # "over 10,000" is only a lower bound, so it can't give the last page
+        if not over:
+            info['total_results'] = total
+            if per_page and per_page > 0:
+                info['last_page'] = math.ceil(total / per_page)
+            if last >= total:
+                info['has_next'] = False
+    
+    if selected_page:
+        info['current_page'] = selected_page
+    if page_numbers:
+        info['last_page'] = max(page_numbers)
+    if info['has_next'] is False and info['current_page']:
+        info['last_page'] = info['current_page']
+    
+    return info
+
+def _probe_selectors(item):
+    """Text each fallback selector finds in a result item"""
+    probes = {}
+    for selector in ('h2 a span', 'h2 span', '[data-cy="title-recipe-title"]', 'h2 a',
+                     '.a-price-whole', '.a-price .a-offscreen', '.a-price-range .a-offscreen'):
+        elem = item.select_one(selector)
+        probes[selector] = elem.get_text(strip=True) if elem else None
+    for selector in ('h2 a', 'a[href*="/dp/"]'):
+        elem = item.select_one(selector)
+        probes[f"{selector} href"] = elem.get('href') if elem else None
+    return probes
+
+def _parse_products(soup):
     products = []
     items = soup.select('[data-component-type="s-search-result"]')
-    print(f"DEBUG: Found {len(items)} product containers")
-    
-    # Debug first 3 items to understand structure
-    for i, item in enumerate(items[:3]):
-        print(f"\n--- DEBUG: Product {i+1} ---")
-        
-        # Try different title selectors
-        title_elem = item.select_one('h2 a span')
-        title_elem2 = item.select_one('h2 span')
-        title_elem3 = item.select_one('[data-cy="title-recipe-title"]')
-        title_elem4 = item.select_one('h2 a')
-        
-        print(f"Title option 1 (h2 a span): {title_elem.get_text(strip=True) if title_elem else 'None'}")
-        print(f"Title option 2 (h2 span): {title_elem2.get_text(strip=True) if title_elem2 else 'None'}")
-        print(f"Title option 3 (data-cy): {title_elem3.get_text(strip=True) if title_elem3 else 'None'}")
-        print(f"Title option 4 (h2 a text): {title_elem4.get_text(strip=True) if title_elem4 else 'None'}")
-        
-        # Try different link selectors
-        link_elem = item.select_one('h2 a')
-        link_elem2 = item.select_one('a[href*="/dp/"]')
-        
-        print(f"Link option 1 (h2 a): {link_elem['href'] if link_elem else 'None'}")
-        print(f"Link option 2 (a[href*=/dp/]): {link_elem2['href'] if link_elem2 else 'None'}")
-        
-        # Try different price selectors
-        price_whole = item.select_one('.a-price-whole')
-        price_elem = item.select_one('.a-price .a-offscreen')
-        price_elem2 = item.select_one('.a-price-range .a-offscreen')
-        
-        print(f"Price option 1 (.a-price-whole): {price_whole.get_text(strip=True) if price_whole else 'None'}")
-        print(f"Price option 2 (.a-price .a-offscreen): {price_elem.get_text(strip=True) if price_elem else 'None'}")
-        print(f"Price option 3 (.a-price-range .a-offscreen): {price_elem2.get_text(strip=True) if price_elem2 else 'None'}")
-        
-        print("---")
+    log_debug(logger, "Found %d product containers", len(items))
+
+    # Selector probes for the first few items, to see which layout Amazon served
+    if debug_enabled(logger):
+        for i, item in enumerate(items[:3]):
+            log_debug(logger, "Selector probe for product %d: %s", i + 1, _probe_selectors(item))
     
     # Updated parsing logic with multiple selector fallbacks
     for item in items:
@@ -0,0 +1,83 @@
+import argparse
+import logging
+import multiprocessing
+import sys
+import os
+from datetime import datetime
+
+# Add parent directory to path for importing data_pipeline and monitoring
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser import parse_search_page
+from data_pipeline.archive import PageArchive
+from data_pipeline.database import DatabaseManager
+from monitoring.logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
+
+_archive = None
+
+def _init_worker(root):
+    global _archive
+    _archive = PageArchive(root=root)
+
+def _parse_snapshot(snapshot):
+    """Worker: parse one archived page with the current parser"""
+    try:
+        products, _ = parse_search_page(_archive.load(snapshot['digest']))
+        return snapshot, products, None
+    except Exception as e:
+        return snapshot, None, f"{type(e).__name__}: {e}"
+
+def _timestamp(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+def reparse(archive, db_manager, since=None, until=None, category=None, workers=None, dry_run=False):
+    """Re-run the parser over archived pages and upsert what it finds.
+
+    Pages are parsed in parallel but saved in fetch order, each with the
+    time it was fetched, so the newest observation of a product wins and
+    nothing newer in the database is overwritten.
+    """
+    snapshots = archive.snapshots(since=since, until=until, category=category)
+    logger.info("Re-parsing %d archived pages", len(snapshots))
+    totals = {'pages': 0, 'failed': 0, 'empty': 0, 'products': 0}
+    if not snapshots:
+        return totals
+
+    workers = workers or os.cpu_count() or 1
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(archive.root,)) as pool:
+        # imap keeps fetch order while parsing runs ahead
+        for snapshot, products, error in pool.imap(_parse_snapshot, snapshots, chunksize=8):
+            totals['pages'] += 1
+            if error:
+                totals['failed'] += 1
+                logger.warning("Failed to re-parse %s (%s): %s", snapshot['url'], snapshot['digest'][:12], error)
+                continue
+            if not products:
+                totals['empty'] += 1
+                continue
+
+            totals['products'] += len(products)
+            if not dry_run:
+                db_manager.save_products(products, category=snapshot['category'],
+                                         scraped_at=datetime.utcfromtimestamp(snapshot['fetched_at']))
+
+    logger.info("Re-parsed %d pages: %d products, %d pages with no products, %d failed",
+                totals['pages'], totals['products'], totals['empty'], totals['failed'])
+    return totals
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-parse archived pages and upsert the products")
+    parser.add_argument('--since', help="ISO date/time, e.g. 2024-05-01")
+    parser.add_argument('--until', help="ISO date/time (exclusive)")
+    parser.add_argument('--category')
+    parser.add_argument('--workers', type=int, help="Parser processes (default: CPU count)")
+    parser.add_argument('--root', help="Archive directory (ARCHIVE_DIR)")
+    parser.add_argument('--dry-run', action='store_true', help="Parse and report without saving")
+    args = parser.parse_args()
+
+    configure_logging()
+    reparse(PageArchive(root=args.root), DatabaseManager(),
+            since=_timestamp(args.since), until=_timestamp(args.until),
+            category=args.category, workers=args.workers, dry_run=args.dry_run)
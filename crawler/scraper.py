@@ -1,29 +1,49 @@
-from playwright.sync_api import sync_playwright
-from parser import parse_search_results
-from proxies import load_proxies, get_random_proxy, get_working_proxy
+import logging
 import time
 import random
 import sys
 import os
+import uuid
+from contextlib import contextmanager
 
 # Add parent directory to path for importing data_pipeline and monitoring
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from parser import parse_search_page, is_blocked_page
+from proxies import load_proxies, get_random_proxy, get_working_proxy
+from session_manager import BrowserSession
 from data_pipeline.database import DatabaseManager
-from data_pipeline.queue import QueueManager
+from data_pipeline.queue import QueueManager, build_page_url
+from data_pipeline.recrawl import RecrawlScheduler
+from data_pipeline.rate_limiter import RateLimiter
+from data_pipeline.archive import PageArchive, archive_enabled
 from monitoring.metrics import metrics
+from monitoring.tracing import tracer
+from monitoring.profiling import JobProfiler, snapshot
+from monitoring.slo import slo_evaluator
+from monitoring.logging_setup import configure_logging, log_context, log_debug
 
-def fetch_page(url, proxy=None):
-    """Fetch a page using Playwright with optional proxy support"""
-    with sync_playwright() as p:
-        # Configure launch arguments
-        launch_args = {"headless": True}
-        if proxy:
-            launch_args["proxy"] = {"server": proxy}
-        
-        browser = None
-        try:
-            browser = p.chromium.launch(**launch_args)
+logger = logging.getLogger(__name__)
+
+# Shared by every worker so the combined request rate per host is capped
+rate_limiter = RateLimiter()
+# Copies of fetched pages for offline re-parsing (crawler/reparse.py)
+page_archive = PageArchive() if archive_enabled() else None
+
+def fetch_page(url, proxy=None, session=None, category='unknown'):
+    """Fetch a page using Playwright with optional proxy support.
+
+    Pass a BrowserSession to reuse its browser; otherwise a browser is
+    launched and closed for this one fetch.
+    """
+    if session is None:
+        with BrowserSession() as one_off_session:
+            return fetch_page(url, proxy=proxy, session=one_off_session, category=category)
+    
+    context = None
+    try:
+        with metrics.stage('browser_launch', proxy=proxy):
+            browser = session.get_browser(proxy)
             context = browser.new_context(
                 user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                            "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -32,171 +52,408 @@ def fetch_page(url, proxy=None):
                 viewport={"width": 1920, "height": 1080}
             )
             page = context.new_page()
-            print(f"Fetching {url} using proxy={proxy} ...")
-            
-            # Navigate with retry logic
-            page.goto(url, timeout=60000, wait_until="domcontentloaded")
-            
-            # Wait a bit for dynamic content
+        log_debug(logger, "Fetching %s using proxy=%s", url, proxy)
+        
+        # Navigate with retry logic
+        with metrics.stage('navigation', url=url):
+            response = page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        if response is not None and response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status}")
+        
+        # Wait a bit for dynamic content
+        with metrics.stage('readiness_wait'):
             page.wait_for_timeout(2000)
-            
+        
+        with metrics.stage('page_content'):
             html = page.content()
-            browser.close()
-            
-            # Record successful request
-            metrics.record_request('success', 'unknown')
-            
-            return html
-            
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-            if browser:
-                browser.close()
-            
-            # Record failed request
-            metrics.record_error('fetch_failed')
-            metrics.record_request('failed', 'unknown')
-            
+        
+        # A captcha or robot check comes back as a normal page; retry it
+        # like a failure so another proxy gets a chance
+        if is_blocked_page(html):
+            logger.warning("Blocked fetching %s using proxy=%s", url, proxy)
+            metrics.record_fetch('blocked', category)
             return None
-
-@metrics.time_request
-def scrape_category(category_url, max_pages=2, use_proxy=False, db_manager=None, category_name="unknown"):
-    """Scrape multiple pages from a category with metrics tracking"""
-    all_products = []
-    
-    # Record scraping start
-    metrics.record_request('started', category_name)
+        
+        # Record successful request
+        metrics.record_fetch('success', category)
+        
+        if page_archive is not None:
+            try:
+                with metrics.stage('archive'):
+                    page_archive.store(html, url, category=category, proxy=proxy)
+            except Exception as e:
+                logger.warning("Failed to archive %s: %s", url, e)
+                metrics.record_error('archive_failed')
+        
+        return html
+        
+    except Exception as e:
+        logger.warning("Error fetching %s: %s", url, e)
+        
+        # Record failed request
+        metrics.record_error('fetch_failed')
+        metrics.record_fetch('failed', category)
+        
+        return None
     
-    # Load proxies if needed
+    finally:
+        if context:
+            try:
+                context.close()
+            except Exception:
+                pass
+
+def select_proxy(use_proxy):
+    """Load proxies and pick a working one if proxies are enabled"""
     proxies = load_proxies() if use_proxy else []
     working_proxy = None
     
     if use_proxy and proxies:
-        working_proxy = get_working_proxy(proxies)
+        with metrics.stage('proxy_selection'):
+            working_proxy = get_working_proxy(proxies)
         if working_proxy:
-            print(f"Using working proxy: {working_proxy}")
+            logger.info("Using working proxy: %s", working_proxy)
             metrics.update_active_proxies(len(proxies))
         else:
-            print("No working proxies found, proceeding without proxy")
+            logger.warning("No working proxies found, proceeding without proxy")
             metrics.record_error('no_working_proxies')
             metrics.update_active_proxies(0)
     
-    for page_num in range(1, max_pages + 1):
-        # Construct URL for pagination
-        if page_num == 1:
-            url = category_url
-        else:
-            separator = "&" if "?" in category_url else "?"
-            url = f"{category_url}{separator}page={page_num}"
-        
-        # Random delay between requests
-        if page_num > 1:
-            delay = random.uniform(2, 5)
-            print(f"Waiting {delay:.2f} seconds before next request...")
-            time.sleep(delay)
-        
-        # Fetch page with retry logic
-        max_retries = 3
-        retry_count = 0
-        html = None
+    return proxies, working_proxy
+
+def fetch_with_retries(url, page_num, use_proxy=False, proxies=None, working_proxy=None, max_retries=3, session=None,
+                       category='unknown'):
+    """Fetch a page with retries, rotating proxies between attempts.
+
+    Returns the HTML (or None) and the proxy that should be used next.
+    """
+    retry_count = 0
+    html = None
+    
+    while retry_count < max_retries and not html:
+        proxy_to_use = working_proxy if use_proxy else None
+        rate_limiter.acquire(url, proxy=proxy_to_use)
+        html = fetch_page(url, proxy=proxy_to_use, session=session, category=category)
         
-        while retry_count < max_retries and not html:
-            proxy_to_use = working_proxy if use_proxy else None
-            html = fetch_page(url, proxy=proxy_to_use)
+        if not html:
+            retry_count += 1
+            logger.info("Retry %d/%d for page %d", retry_count, max_retries, page_num)
             
-            if not html:
-                retry_count += 1
-                print(f"Retry {retry_count}/{max_retries} for page {page_num}")
-                
-                # Try with different proxy if available
-                if use_proxy and proxies and retry_count < max_retries:
+            # Try with different proxy if available
+            if use_proxy and proxies and retry_count < max_retries:
+                with metrics.stage('proxy_selection'):
                     working_proxy = get_working_proxy(proxies)
-                    if working_proxy:
-                        print(f"Trying with new proxy: {working_proxy}")
-                    else:
-                        print("No more working proxies available")
-                        break
-                
-                # Exponential backoff
-                time.sleep(2 ** retry_count)
+                if working_proxy:
+                    logger.info("Trying with new proxy: %s", working_proxy)
+                else:
+                    logger.warning("No more working proxies available")
+                    break
+            
+            # Exponential backoff
+            time.sleep(2 ** retry_count)
+    
+    if not html:
+        logger.error("Failed to fetch page %d after %d retries", page_num, max_retries)
+        metrics.record_error('page_fetch_failed')
+    
+    return html, working_proxy
+
+def process_page(html, page_num, db_manager=None, category_name="unknown", check_unchanged=False):
+    """Parse a fetched page and persist its products.
+
+    Returns the list of products (None if parsing failed) and the page's
+    pagination info. With `check_unchanged`, the info also says whether
+    every product was already stored with the same price.
+    """
+    try:
+        snapshot(f'page{page_num}_before_parse')
+        with metrics.stage('parse', page=page_num):
+            products, page_info = parse_search_page(html)
+        snapshot(f'page{page_num}_after_parse')
+        log_debug(logger, "Found %d products on page %d", len(products), page_num)
         
-        if html:
-            try:
-                products = parse_search_results(html)
-                print(f"Found {len(products)} products on page {page_num}")
-                all_products.extend(products)
-                
-                # Record metrics for successful scraping
-                metrics.record_products_scraped(len(products), category_name)
-                
-                # Save to database after each page if db_manager is provided
-                if db_manager and products:
-                    db_manager.save_products(products, category=category_name)
-                    metrics.record_database_operation('save_products')
-                    
-            except Exception as e:
-                print(f"Error parsing products from page {page_num}: {e}")
-                metrics.record_error('parsing_failed')
-                
+        # Record metrics for successful scraping
+        metrics.record_products_scraped(len(products), category_name)
+        
+        # Compare against stored state before this page overwrites it
+        if check_unchanged and db_manager and products:
+            with metrics.stage('db_lookup'):
+                stored = db_manager.get_stored_prices([product['url'] for product in products])
+            page_info['unchanged'] = all(
+                product['url'] in stored and stored[product['url']] == product['price']
+                for product in products
+            )
+        
+        # Save to database after each page if db_manager is provided
+        if db_manager and products:
+            with metrics.stage('db_upsert', products=len(products)):
+                db_manager.save_products(products, category=category_name)
+            metrics.record_database_operation('save_products')
+            snapshot(f'page{page_num}_after_persist')
+        
+        return products, page_info
+        
+    except Exception as e:
+        logger.exception("Error parsing products from page %d", page_num)
+        metrics.record_error('parsing_failed')
+        return None, {}
+
+def scrape_category(category_url, max_pages=2, use_proxy=False, db_manager=None, category_name="unknown", session=None,
+                    stop_after_unchanged=None, job_id=None, profile=False):
+    """Scrape multiple pages from a category and return every product found.
+
+    Collects iter_category_pages; prefer that when only counts or a few
+    samples are needed. `profile` (or SCRAPER_PROFILE) captures a CPU
+    profile and memory snapshots of the run.
+    """
+    all_products = []
+    with category_span(category_name, job_id=job_id, profile=profile):
+        for page in iter_category_pages(category_url, max_pages, use_proxy, db_manager, category_name, session,
+                                        stop_after_unchanged):
+            all_products.extend(page['products'])
+    return all_products
+
+@contextmanager
+def category_span(category_name, job_id=None, profile=False):
+    """Span, request timing and optional profile around a whole category crawl.
+
+    Every caller of iter_category_pages runs it inside this, so category
+    crawls are observed in scraper_request_duration_seconds.
+    """
+    # Inside a queue job the span inherits its job ID; direct runs get their own
+    if job_id is None and not tracer.current_span():
+        job_id = uuid.uuid4().hex
+    with metrics.request_timer(), \
+            metrics.stage('scrape_category', job_id=job_id, category=category_name) as span, \
+            JobProfiler(span.attributes['job_id'], enabled=profile):
+        yield span
+
+def iter_category_pages(category_url, max_pages=2, use_proxy=False, db_manager=None, category_name="unknown",
+                        session=None, stop_after_unchanged=None):
+    """Scrape a category page by page, yielding each page as it is done.
+
+    Yields {'page', 'url', 'products', 'page_info', 'ok'} for every page
+    attempted; failed fetches yield ok=False with no products. A page's HTML
+    and parse tree are freed before it is yielded, so memory stays flat
+    however many pages are crawled.
+
+    Stops before `max_pages` once the real last page has been reached, and
+    after `stop_after_unchanged` consecutive pages with no new or changed
+    products (EARLY_STOP_UNCHANGED_PAGES, 0 to disable).
+    """
+    if stop_after_unchanged is None:
+        stop_after_unchanged = int(os.getenv('EARLY_STOP_UNCHANGED_PAGES', '0'))
+    unchanged_pages = 0
+    products_found = 0
+    
+    # Record scraping start
+    metrics.record_request('started', category_name)
+    
+    try:
+        proxies, working_proxy = select_proxy(use_proxy)
+        
+        for page_num in range(1, max_pages + 1):
+            url = build_page_url(category_url, page_num)
+            
+            with log_context(page=page_num):
+                html, working_proxy = fetch_with_retries(url, page_num, use_proxy, proxies, working_proxy,
+                                                         session=session, category=category_name)
+                if html:
+                    products, page_info = process_page(html, page_num, db_manager, category_name,
+                                                       check_unchanged=stop_after_unchanged > 0)
+            
+            if not html:
+                unchanged_pages = 0
+                yield {'page': page_num, 'url': url, 'products': [], 'page_info': {}, 'ok': False}
+                continue
+            
+            # Drop the page HTML before handing the results on
+            del html
+            products_found += len(products) if products else 0
+            yield {'page': page_num, 'url': url, 'products': products or [], 'page_info': page_info,
+                   'ok': products is not None}
+            
+            remaining = max_pages - page_num
+            last_page = page_info.get('last_page')
+            if remaining and last_page and page_num >= last_page:
+                logger.info("Reached last page (%d), skipping %d pages", last_page, remaining)
+                metrics.record_pages_skipped('past_last_page', remaining)
+                break
+            
+            unchanged_pages = unchanged_pages + 1 if page_info.get('unchanged') else 0
+            if remaining and stop_after_unchanged and unchanged_pages >= stop_after_unchanged:
+                logger.info("%d consecutive unchanged pages, skipping %d pages", unchanged_pages, remaining)
+                metrics.record_pages_skipped('unchanged', remaining)
+                break
+    finally:
+        # Also runs when the caller stops iterating early
+        if products_found:
+            metrics.record_request('completed', category_name)
         else:
-            print(f"Failed to fetch page {page_num} after {max_retries} retries")
-            metrics.record_error('page_fetch_failed')
+            metrics.record_request('failed', category_name)
+
+def scrape_page_job(job, queue_manager, db_manager, recrawl=None, session=None):
+    """Scrape a single page task produced by QueueManager.add_category_job"""
+    url = job['url']
+    page_num = job.get('page', 1)
+    category = job.get('category', 'unknown')
+    use_proxy = job.get('use_proxy', False)
     
-    # Record final metrics
-    if all_products:
-        metrics.record_request('completed', category_name)
+    # Timed as its own stage: REQUEST_DURATION covers whole category crawls only
+    with metrics.stage('page_job', category=category):
+        # Page 1 (or any page) may have shown this page is past the end
+        if queue_manager.page_beyond_last(job):
+            logger.info("Skipping page %d: past the last page of job %s", page_num, job['parent_id'])
+            metrics.record_pages_skipped('past_last_page')
+            queue_manager.frontier.complete(url)
+            finish_page_job(job, queue_manager, 0, skipped=True, recrawl=recrawl)
+            return 0
+        
+        # Only one worker may fetch a given URL at a time
+        token = queue_manager.frontier.acquire(url)
+        if not token:
+            logger.info("Skipping %s: already being fetched by another worker", url)
+            metrics.record_request('page_skipped', category)
+            finish_page_job(job, queue_manager, 0, skipped=True, recrawl=recrawl)
+            return 0
+        
+        html = None
+        try:
+            proxies, working_proxy = select_proxy(use_proxy)
+            html, _ = fetch_with_retries(url, page_num, use_proxy, proxies, working_proxy, session=session,
+                                         category=category)
+        finally:
+            queue_manager.frontier.complete(url, token, fetched=bool(html))
+        
+        products, page_info = process_page(html, page_num, db_manager, category) if html else (None, {})
+        success = products is not None
+        
+        if page_info.get('last_page'):
+            queue_manager.set_parent_last_page(job['parent_id'], page_info['last_page'])
+        products_found = len(products) if products else 0
+        
+        metrics.record_request('page_completed' if success else 'page_failed', category)
+        
+        # Recrawl targets track whether their pages changed since the last crawl
+        target = job.get('recrawl_target')
+        changed = False
+        if recrawl and target and products:
+            changed = recrawl.page_changed(target, page_num, products)
+        
+        finish_page_job(job, queue_manager, products_found, success=success, changed=changed, recrawl=recrawl)
+        return products_found
+
+def finish_page_job(job, queue_manager, products_found, success=True, changed=False, skipped=False, recrawl=None):
+    """Report a page task to its parent and handle the parent finishing"""
+    category = job.get('category', 'unknown')
+    target = job.get('recrawl_target')
+    
+    # The last page to finish publishes the parent's aggregated result
+    result = queue_manager.record_page_result(job, products_found, success=success, changed=changed, skipped=skipped)
+    if result:
+        metrics.record_request(result['status'], category)
+        logger.info("Job %s %s: %d products, %d/%d pages failed", result['job_id'], result['status'],
+                    result['products_found'], result['pages_failed'], result['pages_total'])
+        
+        if recrawl and target:
+            # A failed crawl tells us nothing about the change rate
+            interval = recrawl.reschedule(target, result['changed'] if result['products_found'] else None)
+            logger.info("Next recrawl of %s in %.0f minutes", target, interval / 60)
+    
+    return result
+
+def process_job(job, queue_manager, db_manager, recrawl=None, session=None):
+    """Run a single queue job: a page task or a whole-category job"""
+    if job.get('parent_id'):
+        job_id = f"{job['parent_id']}:{job.get('page', 1)}"
     else:
-        metrics.record_request('failed', category_name)
+        job_id = job.get('job_id') or uuid.uuid4().hex
     
-    return all_products
+    # Every stage below records a span under this job's ID; log records pick
+    # it up too, and a job submitted with debug=True logs verbosely
+    with metrics.stage('job', job_id=job_id, category=job.get('category', 'unknown')), \
+            JobProfiler(job_id, enabled=job.get('profile', False)), \
+            log_context(page=job.get('page') if job.get('parent_id') else None, verbose=job.get('debug', False)):
+        _run_job(job, queue_manager, db_manager, recrawl, session)
+
+def _run_job(job, queue_manager, db_manager, recrawl=None, session=None):
+    if job.get('parent_id'):
+        # Page task fanned out from a category job
+        log_debug(logger, "Processing page %s of job %s", job.get('page'), job['parent_id'])
+        products_found = scrape_page_job(job, queue_manager, db_manager, recrawl, session=session)
+        log_debug(logger, "Page task completed: %d products found", products_found)
+        return
+    
+    url = job.get('url')
+    category = job.get('category', 'unknown')
+    max_pages = job.get('max_pages', 1)
+    use_proxy = job.get('use_proxy', False)
+    logger.info("Processing job: %s (%d pages)", url, max_pages)
+    
+    # Scrape the category; only the count is kept
+    products_found = 0
+    with category_span(category):
+        for page in iter_category_pages(url, max_pages, use_proxy, db_manager, category, session):
+            products_found += len(page['products'])
+            # A category crawl can outlast the claim window; keep the URL held
+            queue_manager.hold_jobs([job])
+    
+    # Add result to results queue
+    result = {
+        'job': {k: v for k, v in job.items() if k != '_msg_id'},
+        'products_found': products_found,
+        'status': 'completed' if products_found else 'failed',
+        'timestamp': time.time()
+    }
+    queue_manager.add_result(result)
+    if url:
+        queue_manager.frontier.complete(url, fetched=bool(products_found))
+    
+    logger.info("Job completed: %d products found", products_found)
+
+def scrape_with_queue(queue_manager, db_manager, stop_event=None, session=None, on_job_done=None):
+    """Process scraping jobs from queue with metrics tracking.
 
-def scrape_with_queue(queue_manager, db_manager):
-    """Process scraping jobs from queue with metrics tracking"""
-    print("Starting queue worker...")
+    Runs until interrupted or until `stop_event` is set; the job in hand is
+    always finished first.
+    """
+    logger.info("Starting queue worker")
     metrics.record_request('queue_worker_started', 'system')
+    slo_evaluator.start()
+    recrawl = RecrawlScheduler(queue_manager.redis_client)
+    prefetch = int(os.getenv('WORKER_PREFETCH', '1'))
+    # Short enough that a stop request is noticed promptly
+    poll_timeout = int(os.getenv('WORKER_POLL_TIMEOUT', '5'))
     
-    while True:
+    while not (stop_event and stop_event.is_set()):
         try:
-            job = queue_manager.get_job(timeout=30)
-            if job:
-                print(f"Processing job: {job}")
-                
-                url = job.get('url')
-                category = job.get('category', 'unknown')
-                max_pages = job.get('max_pages', 1)
-                use_proxy = job.get('use_proxy', False)
-                
-                # Scrape the category
-                products = scrape_category(
-                    category_url=url,
-                    max_pages=max_pages,
-                    use_proxy=use_proxy,
-                    db_manager=db_manager,
-                    category_name=category
-                )
-                
-                # Add result to results queue
-                result = {
-                    'job': job,
-                    'products_found': len(products),
-                    'status': 'completed' if products else 'failed',
-                    'timestamp': time.time()
-                }
-                queue_manager.add_result(result)
-                
-                print(f"Job completed: {len(products)} products found")
-                
-            else:
-                print("No jobs in queue, waiting...")
-                time.sleep(10)
+            # get_jobs already blocks for poll_timeout, so no extra sleep when idle
+            with metrics.stage('queue_wait'):
+                jobs = queue_manager.get_jobs(count=prefetch, timeout=poll_timeout)
+            
+            for i, job in enumerate(jobs):
+                if i:
+                    # Prefetched jobs may have waited out their claim behind earlier ones
+                    queue_manager.hold_jobs([job])
+                try:
+                    process_job(job, queue_manager, db_manager, recrawl, session=session)
+                except Exception as e:
+                    logger.exception("Error processing job")
+                    metrics.record_error('queue_worker_error')
+                # Failed jobs are acknowledged too so they aren't redelivered forever
+                queue_manager.ack_job(job)
+                if on_job_done:
+                    on_job_done()
                 
         except KeyboardInterrupt:
-            print("Queue worker stopped by user")
+            logger.info("Queue worker stopped by user")
             break
         except Exception as e:
-            print(f"Error in queue worker: {e}")
+            logger.exception("Error in queue worker")
             metrics.record_error('queue_worker_error')
             time.sleep(5)
+    
+    logger.info("Queue worker stopped")
 
 def run_health_check(db_manager):
     """Run a health check on the scraper system"""
@@ -229,6 +486,7 @@ def run_health_check(db_manager):
         return False
 
 if __name__ == "__main__":
+    configure_logging()
     print("Starting Amazon product scraper with database and monitoring...")
     
     # START METRICS SERVER FIRST
@@ -277,21 +535,23 @@ if __name__ == "__main__":
         category_name = 'laptops'
         category_url = category_urls[category_name]
         
-        all_products = scrape_category(
-            category_url=category_url, 
-            max_pages=2,  # Reduced for testing
-            use_proxy=use_proxy,
-            db_manager=db_manager,
-            category_name=category_name
-        )
+        # Keep the count and a few samples rather than every product
+        total_products = 0
+        samples = []
+        with category_span(category_name):
+            for page in iter_category_pages(category_url, max_pages=2,  # Reduced for testing
+                                            use_proxy=use_proxy, db_manager=db_manager,
+                                            category_name=category_name):
+                total_products += len(page['products'])
+                samples.extend(page['products'][:3 - len(samples)])
         
         print(f"\n=== SINGLE CATEGORY SCRAPING COMPLETE ===")
         print(f"Category: {category_name}")
-        print(f"Total products found: {len(all_products)}")
+        print(f"Total products found: {total_products}")
         
-        if all_products:
+        if samples:
             print(f"\nFirst 3 products scraped:")
-            for i, product in enumerate(all_products[:3], 1):
+            for i, product in enumerate(samples, 1):
                 print(f"{i}. {product['name'][:60]}...")
                 print(f"   Price: {product['price']}")
                 print(f"   Rating: {product['rating']}")
@@ -307,16 +567,14 @@ if __name__ == "__main__":
         for category_name, category_url in category_urls.items():
             print(f"\n--- Scraping {category_name.upper()} ---")
             
-            all_products = scrape_category(
-                category_url=category_url, 
-                max_pages=max_pages, 
-                use_proxy=use_proxy,
-                db_manager=db_manager,
-                category_name=category_name
-            )
+            category_products = 0
+            with category_span(category_name):
+                for page in iter_category_pages(category_url, max_pages=max_pages, use_proxy=use_proxy,
+                                                db_manager=db_manager, category_name=category_name):
+                    category_products += len(page['products'])
             
-            total_products_all += len(all_products)
-            print(f"Completed {category_name}: {len(all_products)} products")
+            total_products_all += category_products
+            print(f"Completed {category_name}: {category_products} products")
             
             # Delay between categories
             if category_name != list(category_urls.keys())[-1]:  # Not the last category
@@ -344,7 +602,8 @@ if __name__ == "__main__":
                 'use_proxy': use_proxy
             }
             sample_jobs.append(job)
-            queue_manager.add_job(job)
+            # Fan the category out into page tasks so any worker can take them
+            queue_manager.add_category_job(job)
         
         print(f"Added {len(sample_jobs)} jobs to queue")
         print(f"Queue size: {queue_manager.get_queue_size()}")
@@ -0,0 +1,49 @@
+from playwright.sync_api import sync_playwright
+
+class BrowserSession:
+    """Keeps Playwright browsers open for the life of a worker process.
+
+    Launching Chromium for every page is the most expensive part of a fetch,
+    so long-running workers reuse one browser per proxy and only open a fresh
+    context per page.
+    """
+
+    def __init__(self, headless=True):
+        self.headless = headless
+        self._playwright = None
+        self._browsers = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+
+    def get_browser(self, proxy=None):
+        """Get the browser for a proxy, relaunching it if it has died"""
+        self.start()
+        browser = self._browsers.get(proxy)
+        if browser is None or not browser.is_connected():
+            launch_args = {"headless": self.headless}
+            if proxy:
+                launch_args["proxy"] = {"server": proxy}
+            browser = self._playwright.chromium.launch(**launch_args)
+            self._browsers[proxy] = browser
+        return browser
+
+    def close(self):
+        """Close every browser and stop Playwright"""
+        for browser in self._browsers.values():
+            try:
+                browser.close()
+            except Exception:
+                pass
+        self._browsers = {}
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
@@ -0,0 +1,236 @@
+import logging
+import math
+import multiprocessing
+import signal
+import time
+import sys
+import os
+
+# Add parent directory to path for importing data_pipeline and monitoring
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring.multiprocess import prepare_multiprocess_dir, mark_worker_dead
+
+# Workers each record into their own files and the supervisor serves the
+# pod totals; this has to happen before prometheus_client is imported
+if __name__ == "__main__" and os.getenv('METRICS_MULTIPROCESS', 'true').lower() == 'true':
+    prepare_multiprocess_dir()
+
+from data_pipeline.database import DatabaseManager
+from data_pipeline.queue import QueueManager
+from monitoring.metrics import metrics
+from monitoring.logging_setup import configure_logging, shutdown_logging
+from monitoring.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+def run_worker(stop_event, jobs_done):
+    """Worker process entrypoint: its own browser, DB pool and queue connection"""
+    # The supervisor owns shutdown; it tells us to stop through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    from scraper import scrape_with_queue
+    from session_manager import BrowserSession
+
+    def on_job_done():
+        with jobs_done.get_lock():
+            jobs_done.value += 1
+
+    configure_logging()
+    db_manager = DatabaseManager()
+    queue_manager = QueueManager()
+    try:
+        with BrowserSession() as session:
+            scrape_with_queue(queue_manager, db_manager, stop_event=stop_event,
+                              session=session, on_job_done=on_job_done)
+    finally:
+        # Worker processes skip atexit, so export pending spans and drain the
+        # log queue explicitly; spans first, as a failed export is logged
+        tracer.shutdown()
+        shutdown_logging()
+
+class WorkerSupervisor:
+    """Runs queue workers as separate processes and scales them with demand.
+
+    Every scale interval the supervisor restarts crashed workers, reads the
+    queue depth and recent throughput, and moves the worker count towards
+    what is needed to drain the backlog within `drain_target` seconds.
+    """
+
+    def __init__(self, min_workers=None, max_workers=None):
+        self.min_workers = min_workers or int(os.getenv('WORKERS_MIN', '1'))
+        self.max_workers = max_workers or int(os.getenv('WORKERS_MAX', '4'))
+        self.scale_interval = float(os.getenv('WORKERS_SCALE_INTERVAL', '15'))
+        self.drain_target = float(os.getenv('WORKERS_DRAIN_TARGET', '300'))
+        # Used until we have observed throughput to go on
+        self.backlog_per_worker = int(os.getenv('WORKERS_BACKLOG_PER_WORKER', '5'))
+        self.shutdown_grace = float(os.getenv('WORKERS_SHUTDOWN_GRACE', '120'))
+        # Crash restarts back off exponentially so a worker that dies on
+        # startup (browser launch, database down) doesn't fork-loop
+        self.restart_backoff = float(os.getenv('WORKERS_RESTART_BACKOFF', '1'))
+        self.restart_backoff_max = float(os.getenv('WORKERS_RESTART_BACKOFF_MAX', '300'))
+        # A worker that ran this long before crashing resets the backoff
+        self.stable_after = float(os.getenv('WORKERS_STABLE_AFTER', '60'))
+
+        self.ctx = multiprocessing.get_context('spawn')
+        self.jobs_done = self.ctx.Value('i', 0)
+        self.workers = {}  # pid -> (process, stop_event, started_at)
+        self.retiring = {}
+        self.restarts = []  # times at which crashed workers are due to be replaced
+        self.crash_streak = 0
+        self.stopping = False
+        self.queue_manager = None
+        self._last_jobs_done = 0
+        self._last_sample = time.time()
+        self.throughput = 0.0
+
+    def _signal_handler(self, signum, frame):
+        logger.info("Received signal %d. Draining workers...", signum)
+        self.stopping = True
+
+    def _spawn(self):
+        stop_event = self.ctx.Event()
+        process = self.ctx.Process(target=run_worker, args=(stop_event, self.jobs_done),
+                                   name='scraper-worker')
+        process.start()
+        self.workers[process.pid] = (process, stop_event, time.time())
+        logger.info("Started worker %d", process.pid)
+
+    def _retire_one(self):
+        """Drop a pending restart, or ask the newest worker to finish its current job and exit"""
+        if self.restarts:
+            self.restarts.pop()
+            return
+        # PIDs wrap, so go by spawn time
+        pid = max(self.workers, key=lambda pid: self.workers[pid][2])
+        worker = self.workers.pop(pid)
+        worker[1].set()
+        self.retiring[pid] = worker
+        logger.info("Retiring worker %d", pid)
+
+    def _reap(self):
+        """Collect exited workers and restart any that crashed"""
+        for pid, (process, _, _) in list(self.retiring.items()):
+            if not process.is_alive():
+                process.join()
+                mark_worker_dead(pid)
+                del self.retiring[pid]
+
+        now = time.time()
+        for pid, (process, _, started_at) in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            mark_worker_dead(pid)
+            del self.workers[pid]
+            if self.stopping:
+                continue
+            self.crash_streak = 1 if now - started_at >= self.stable_after else self.crash_streak + 1
+            delay = min(self.restart_backoff_max, self.restart_backoff * 2 ** (self.crash_streak - 1))
+            logger.warning("Worker %d exited with code %s after %.0fs; restarting in %.0fs", pid,
+                           process.exitcode, now - started_at, delay)
+            self.restarts.append(now + delay)
+
+        due = [at for at in self.restarts if at <= now]
+        self.restarts = [at for at in self.restarts if at > now]
+        for _ in due:
+            if not self.stopping:
+                metrics.record_worker_restart()
+                self._spawn()
+
+    def _sample_throughput(self):
+        now = time.time()
+        jobs_done = self.jobs_done.value
+        elapsed = now - self._last_sample
+        if elapsed > 0:
+            self.throughput = (jobs_done - self._last_jobs_done) / elapsed
+        self._last_jobs_done = jobs_done
+        self._last_sample = now
+        return self.throughput
+
+    def desired_workers(self, queue_depth, throughput, current):
+        """Worker count needed to drain `queue_depth` jobs within the drain target"""
+        if queue_depth == 0:
+            desired = self.min_workers
+        elif throughput > 0 and current:
+            per_worker = throughput / current
+            desired = math.ceil(queue_depth / (per_worker * self.drain_target))
+        else:
+            desired = math.ceil(queue_depth / self.backlog_per_worker)
+
+        desired = max(self.min_workers, min(self.max_workers, desired))
+        # Scale down one worker at a time to avoid flapping
+        if desired < current:
+            desired = current - 1
+        return desired
+
+    def _scale(self):
+        try:
+            queue_depth = self.queue_manager.get_queue_size()
+        except Exception as e:
+            logger.warning("Could not read queue depth: %s", e)
+            metrics.record_error('queue_depth_failed')
+            return
+
+        throughput = self._sample_throughput()
+        # Workers waiting out their restart backoff still count
+        current = len(self.workers) + len(self.restarts)
+        desired = self.desired_workers(queue_depth, throughput, current)
+
+        if desired != current:
+            logger.info("Scaling workers %d -> %d (queue depth %d, %.2f jobs/s)", current, desired, queue_depth,
+                        throughput)
+        for _ in range(desired - current):
+            self._spawn()
+        for _ in range(current - desired):
+            self._retire_one()
+
+        metrics.update_queue_depth(queue_depth)
+        metrics.update_workers(len(self.workers), throughput)
+
+    def _drain(self):
+        """Stop every worker, waiting for in-flight jobs up to the grace period"""
+        self.retiring.update(self.workers)
+        self.workers = {}
+        self.restarts = []
+        for _, stop_event, _ in self.retiring.values():
+            stop_event.set()
+
+        deadline = time.time() + self.shutdown_grace
+        for pid, (process, _, _) in self.retiring.items():
+            process.join(max(0, deadline - time.time()))
+            if process.is_alive():
+                logger.warning("Worker %d did not stop in time, terminating", pid)
+                process.terminate()
+                process.join()
+            mark_worker_dead(pid)
+        self.retiring = {}
+        metrics.update_workers(0, 0)
+
+    def run(self):
+        """Supervise workers until SIGTERM/SIGINT, then drain"""
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+        metrics.start_metrics_server()
+        self.queue_manager = QueueManager()
+
+        logger.info("Starting supervisor with %d-%d workers", self.min_workers, self.max_workers)
+        for _ in range(self.min_workers):
+            self._spawn()
+
+        next_scale = time.time()
+        while not self.stopping:
+            self._reap()
+            if time.time() >= next_scale:
+                self._scale()
+                next_scale = time.time() + self.scale_interval
+            time.sleep(1)
+
+        self._drain()
+        logger.info("Supervisor stopped")
+
+if __name__ == "__main__":
+    configure_logging()
+    WorkerSupervisor().run()
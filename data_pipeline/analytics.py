@@ -0,0 +1,313 @@
+import argparse
+import os
+import numpy as np
+from sqlalchemy import select
+from dotenv import load_dotenv
+from data_pipeline.database import PriceHistory
+from data_pipeline.frontier import product_key
+
+load_dotenv()
+
+PERCENTILES = (10, 25, 50, 75, 90)
+SECONDS_PER_DAY = 86400
+
+def grouped_percentiles(groups, values, percentiles, n_groups):
+    """Linear-interpolated percentiles of `values` within each group.
+
+    Returns an (n_groups, len(percentiles)) array, NaN for empty groups.
+    One sort handles every group: sorted by (group, value), each group is a
+    contiguous run and its percentiles are fixed offsets into that run.
+    """
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+
+    result = np.full((n_groups, len(percentiles)), np.nan)
+    has_values = counts > 0
+    for i, pct in enumerate(percentiles):
+        position = starts[has_values] + (pct / 100) * (counts[has_values] - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        fraction = position - low
+        result[has_values, i] = sorted_values[low] + (sorted_values[high] - sorted_values[low]) * fraction
+    return result
+
+class _Codes:
+    """Stable integer codes for strings (product keys, categories)"""
+
+    def __init__(self):
+        self.index = {}
+        self.names = []
+
+    def encode(self, values):
+        index = self.index
+        codes = np.empty(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(self.names)
+                self.names.append(value)
+            codes[i] = code
+        return codes
+
+    def __len__(self):
+        return len(self.names)
+
+def iter_column_chunks(engine, since_id=0, chunk_size=None):
+    """Stream price history rows after `since_id` as chunks of NumPy columns.
+
+    Rows come straight off the cursor `chunk_size` at a time (a server-side
+    cursor on PostgreSQL), so memory is bounded by the chunk, not the table.
+    """
+    chunk_size = chunk_size or int(os.getenv('ANALYTICS_CHUNK_SIZE', '50000'))
+    stmt = (select(PriceHistory.id, PriceHistory.url, PriceHistory.asin, PriceHistory.category, PriceHistory.price,
+                   PriceHistory.rating, PriceHistory.num_reviews, PriceHistory.scraped_at)
+            .where(PriceHistory.id > since_id)
+            .order_by(PriceHistory.id))
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        for rows in result.partitions():
+            ids, urls, asins, categories, prices, ratings, reviews, scraped_at = zip(*rows)
+            # None becomes NaN in float columns
+            yield {
+                'id': np.array(ids, dtype=np.int64),
+                'url': urls,
+                # Raw links change with every crawl's tracking parameters
+                'product': [asin or product_key(url) for asin, url in zip(asins, urls)],
+                'category': [category or 'unknown' for category in categories],
+                'price': np.array(prices, dtype=np.float64),
+                'rating': np.array(ratings, dtype=np.float64),
+                'num_reviews': np.array(reviews, dtype=np.float64),
+                'timestamp': np.array(scraped_at, dtype='datetime64[s]').astype(np.int64),
+            }
+
+class CategoryAnalytics:
+    """Per-category price statistics over the scraped price history.
+
+    Keeps the last observation of every product per day, plus each
+    product's latest category, rating and review count, as NumPy arrays.
+    refresh() loads the whole history; update() folds in only the rows
+    added since the last load. From those arrays stats() gives price
+    percentiles, review-weighted ratings and day-over-day moves per
+    category, and anomalies() flags outlying prices and sharp price moves.
+    """
+
+    def __init__(self, db_manager, chunk_size=None):
+        self.engine = db_manager.engine
+        self.chunk_size = chunk_size
+        self.outlier_z = float(os.getenv('ANALYTICS_OUTLIER_Z', '3.5'))
+        self.drop_threshold = float(os.getenv('ANALYTICS_DROP_THRESHOLD', '0.2'))
+        self.spike_threshold = float(os.getenv('ANALYTICS_SPIKE_THRESHOLD', '0.5'))
+        self._reset()
+
+    def _reset(self):
+        self.products = _Codes()
+        self.categories = _Codes()
+        self.last_id = 0
+        # Last observation of each (product, day), sorted by product then day
+        self.day_product = np.empty(0, dtype=np.int64)
+        self.day = np.empty(0, dtype=np.int64)
+        self.day_timestamp = np.empty(0, dtype=np.int64)
+        self.day_price = np.empty(0, dtype=np.float64)
+        # Latest attributes per product code
+        self.product_timestamp = np.empty(0, dtype=np.int64)
+        self.product_url = np.empty(0, dtype=object)
+        self.product_category = np.empty(0, dtype=np.int64)
+        self.product_rating = np.empty(0, dtype=np.float64)
+        self.product_reviews = np.empty(0, dtype=np.float64)
+
+    def refresh(self):
+        """Reload everything from the database"""
+        self._reset()
+        return self.update()
+
+    def update(self):
+        """Fold in price history rows added since the last load; returns how many"""
+        loaded = 0
+        for chunk in iter_column_chunks(self.engine, self.last_id, self.chunk_size):
+            self._merge(chunk)
+            self.last_id = max(self.last_id, int(chunk['id'].max()))
+            loaded += len(chunk['id'])
+        return loaded
+
+    def _merge(self, chunk):
+        product = self.products.encode(chunk['product'])
+        category = self.categories.encode(chunk['category'])
+        timestamp = chunk['timestamp']
+        self._grow(len(self.products))
+
+        # Day table: keep the last observation of each (product, day)
+        all_product = np.concatenate([self.day_product, product])
+        all_timestamp = np.concatenate([self.day_timestamp, timestamp])
+        all_day = np.concatenate([self.day, timestamp // SECONDS_PER_DAY])
+        all_price = np.concatenate([self.day_price, chunk['price']])
+        order = np.lexsort((all_timestamp, all_day, all_product))
+        all_product, all_day = all_product[order], all_day[order]
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (all_product[1:] != all_product[:-1]) | (all_day[1:] != all_day[:-1])
+        self.day_product = all_product[last]
+        self.day = all_day[last]
+        self.day_timestamp = all_timestamp[order][last]
+        self.day_price = all_price[order][last]
+
+        # Latest attributes: last row of each product in the chunk, if newer
+        order = np.lexsort((timestamp, product))
+        sorted_product = product[order]
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = sorted_product[1:] != sorted_product[:-1]
+        rows = order[last]
+        codes = product[rows]
+        newer = timestamp[rows] >= self.product_timestamp[codes]
+        rows, codes = rows[newer], codes[newer]
+        self.product_timestamp[codes] = timestamp[rows]
+        self.product_url[codes] = np.asarray(chunk['url'], dtype=object)[rows]
+        self.product_category[codes] = category[rows]
+        self.product_rating[codes] = chunk['rating'][rows]
+        self.product_reviews[codes] = chunk['num_reviews'][rows]
+
+    def _grow(self, size):
+        extra = size - len(self.product_timestamp)
+        if extra <= 0:
+            return
+        self.product_timestamp = np.concatenate([self.product_timestamp, np.full(extra, np.iinfo(np.int64).min)])
+        self.product_url = np.concatenate([self.product_url, np.full(extra, None, dtype=object)])
+        self.product_category = np.concatenate([self.product_category, np.zeros(extra, dtype=np.int64)])
+        self.product_rating = np.concatenate([self.product_rating, np.full(extra, np.nan)])
+        self.product_reviews = np.concatenate([self.product_reviews, np.full(extra, np.nan)])
+
+    def price_moves(self):
+        """Latest price, the price on the previous day seen, and the change, per product"""
+        n = len(self.products)
+        latest = np.full(n, np.nan)
+        previous = np.full(n, np.nan)
+        if len(self.day_product):
+            last = np.ones(len(self.day_product), dtype=bool)
+            last[:-1] = self.day_product[1:] != self.day_product[:-1]
+            last_rows = np.flatnonzero(last)
+            latest[self.day_product[last_rows]] = self.day_price[last_rows]
+
+            prev_rows = last_rows - 1
+            has_prev = prev_rows >= 0
+            has_prev[has_prev] = self.day_product[prev_rows[has_prev]] == self.day_product[last_rows[has_prev]]
+            previous[self.day_product[last_rows[has_prev]]] = self.day_price[prev_rows[has_prev]]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = (latest - previous) / previous
+        return latest, previous, change
+
+    def stats(self):
+        """Per-category summary of the latest prices and day-over-day moves"""
+        n_categories = len(self.categories)
+        latest, previous, change = self.price_moves()
+        category = self.product_category
+        priced = np.isfinite(latest)
+
+        percentiles = grouped_percentiles(category[priced], latest[priced], PERCENTILES, n_categories)
+        products = np.bincount(category, minlength=n_categories)
+        priced_count = np.bincount(category[priced], minlength=n_categories)
+        mean_price = np.bincount(category[priced], weights=latest[priced], minlength=n_categories)
+
+        rated = np.isfinite(self.product_rating) & np.isfinite(self.product_reviews)
+        weights = self.product_reviews[rated]
+        weighted_rating = np.bincount(category[rated], weights=self.product_rating[rated] * weights,
+                                      minlength=n_categories)
+        total_weight = np.bincount(category[rated], weights=weights, minlength=n_categories)
+
+        moved = np.isfinite(change)
+        moved_count = np.bincount(category[moved], minlength=n_categories)
+        change_sum = np.bincount(category[moved], weights=change[moved], minlength=n_categories)
+        up = np.bincount(category[moved & (change > 0)], minlength=n_categories)
+        down = np.bincount(category[moved & (change < 0)], minlength=n_categories)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_price = mean_price / priced_count
+            weighted_rating = weighted_rating / total_weight
+            mean_change = change_sum / moved_count
+
+        def value(array, i):
+            return None if np.isnan(array[i]) else round(float(array[i]), 4)
+
+        return {
+            name: {
+                'products': int(products[i]),
+                'priced': int(priced_count[i]),
+                'mean_price': value(mean_price, i),
+                'percentiles': {f"p{pct}": value(percentiles[i], j) for j, pct in enumerate(PERCENTILES)},
+                'review_weighted_rating': value(weighted_rating, i),
+                'price_moves': int(moved_count[i]),
+                'prices_up': int(up[i]),
+                'prices_down': int(down[i]),
+                'mean_change': value(mean_change, i),
+            }
+            for i, name in enumerate(self.categories.names)
+        }
+
+    def anomalies(self):
+        """Products whose price is an outlier in its category or moved sharply.
+
+        Outliers use a robust z-score, (price - median) / MAD, so a few
+        extreme prices don't hide each other.
+        """
+        n_categories = len(self.categories)
+        latest, previous, change = self.price_moves()
+        category = self.product_category
+        priced = np.isfinite(latest)
+
+        median = grouped_percentiles(category[priced], latest[priced], (50,), n_categories)[:, 0]
+        deviation = np.abs(latest[priced] - median[category[priced]])
+        mad = grouped_percentiles(category[priced], deviation, (50,), n_categories)[:, 0]
+
+        z = np.full(len(latest), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z[priced] = 0.6745 * (latest[priced] - median[category[priced]]) / mad[category[priced]]
+        outlier = np.isfinite(z) & (np.abs(z) > self.outlier_z)
+        moved = np.isfinite(change)
+        drop = moved & (change <= -self.drop_threshold)
+        spike = moved & (change >= self.spike_threshold)
+
+        flagged = []
+        for code in np.flatnonzero(outlier | drop | spike):
+            flags = [flag for flag, mask in (('outlier', outlier), ('price_drop', drop), ('price_spike', spike))
+                     if mask[code]]
+            flagged.append({
+                'product': self.products.names[code],
+                'url': self.product_url[code],
+                'category': self.categories.names[category[code]],
+                'price': float(latest[code]),
+                'previous_price': None if np.isnan(previous[code]) else float(previous[code]),
+                'change': None if np.isnan(change[code]) else round(float(change[code]), 4),
+                'z_score': None if np.isnan(z[code]) else round(float(z[code]), 2),
+                'flags': flags,
+            })
+        return flagged
+
+if __name__ == "__main__":
+    from data_pipeline.database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Category price analytics over the price history")
+    parser.add_argument('--anomalies', type=int, default=20, help="Number of flagged products to list")
+    parser.add_argument('--backfill', action='store_true', help="Seed price history from the products table first")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager()
+    db_manager.create_tables()
+    if args.backfill:
+        print(f"Backfilled {db_manager.backfill_price_history()} price history rows")
+
+    analytics = CategoryAnalytics(db_manager)
+    print(f"Loaded {analytics.refresh()} price history rows")
+
+    print(f"\n{'category':<16}{'products':>9}{'p10':>10}{'p50':>10}{'p90':>10}{'rating':>8}{'moves':>7}{'change':>9}")
+    for name, summary in analytics.stats().items():
+        p = summary['percentiles']
+        change = summary['mean_change']
+        print(f"{name:<16}{summary['products']:>9}{p['p10'] or 0:>10.0f}{p['p50'] or 0:>10.0f}{p['p90'] or 0:>10.0f}"
+              f"{summary['review_weighted_rating'] or 0:>8.2f}{summary['price_moves']:>7}"
+              f"{(change or 0):>+9.1%}")
+
+    flagged = analytics.anomalies()
+    print(f"\n{len(flagged)} flagged products")
+    for item in flagged[:args.anomalies]:
+        print(f"- [{', '.join(item['flags'])}] {item['category']}: {item['price']:.0f} "
+              f"(was {item['previous_price']}) {item['url']}")
@@ -0,0 +1,199 @@
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from monitoring.logging_setup import configure_logging
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    digest TEXT NOT NULL REFERENCES blobs(digest),
+    url TEXT NOT NULL,
+    category TEXT,
+    proxy TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_fetched_at ON snapshots (fetched_at);
+CREATE INDEX IF NOT EXISTS snapshots_category ON snapshots (category, fetched_at);
+"""
+
+def archive_enabled():
+    """ARCHIVE_PAGES=true keeps a copy of every page fetched by this process"""
+    return os.getenv('ARCHIVE_PAGES', 'false').lower() in ('1', 'true', 'yes')
+
+class PageArchive:
+    """Content-addressed, zstd-compressed archive of fetched pages.
+
+    Each distinct page body is stored once under its SHA-256 in
+    <root>/objects/ab/cdef....zst, and every fetch adds a row to the SQLite
+    index at <root>/index.db with its URL, category, proxy and time, so a
+    range of the archive can be re-parsed later without fetching anything.
+    Snapshots older than `retention_days` are pruned, then the oldest ones
+    until the compressed blobs fit in `max_bytes`.
+    """
+
+    def __init__(self, root=None, max_bytes=None, retention_days=None, level=None):
+        if zstandard is None:
+            raise ValueError("The page archive requires the zstandard package")
+        self.root = root or os.getenv('ARCHIVE_DIR', 'archive')
+        self.max_bytes = max_bytes or int(float(os.getenv('ARCHIVE_MAX_MB', '2048')) * 1024 * 1024)
+        self.retention_days = retention_days or float(os.getenv('ARCHIVE_RETENTION_DAYS', '30'))
+        self.level = level or int(os.getenv('ARCHIVE_ZSTD_LEVEL', '10'))
+        # Stores between automatic prunes
+        self.prune_every = int(os.getenv('ARCHIVE_PRUNE_EVERY', '500'))
+        self.index_path = os.path.join(self.root, 'index.db')
+        self._stores = 0
+        self._local = threading.local()
+
+        os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Connections can't be shared between threads; the timeout covers
+        # other worker processes writing to the same index
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:] + '.zst')
+
+    def store(self, html, url, category=None, proxy=None, fetched_at=None):
+        """Archive a fetched page; returns its digest"""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        now = time.time()
+
+        if not os.path.exists(path):
+            compressed = zstandard.ZstdCompressor(level=self.level).compress(data)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a partial blob
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+            stored_size = len(compressed)
+        else:
+            stored_size = os.path.getsize(path)
+
+        with self._connect() as conn:
+            conn.execute('INSERT OR IGNORE INTO blobs (digest, size, stored_size, created_at) VALUES (?, ?, ?, ?)',
+                         (digest, len(data), stored_size, now))
+            conn.execute('INSERT INTO snapshots (digest, url, category, proxy, fetched_at) VALUES (?, ?, ?, ?, ?)',
+                         (digest, url, category, proxy, fetched_at or now))
+
+        self._stores += 1
+        if self.prune_every and self._stores % self.prune_every == 0:
+            self.prune()
+        return digest
+
+    def load(self, digest):
+        """Decompressed HTML of an archived page"""
+        with open(self._blob_path(digest), 'rb') as f:
+            return zstandard.ZstdDecompressor().decompress(f.read()).decode('utf-8')
+
+    def snapshots(self, since=None, until=None, category=None):
+        """Index rows in fetch order, optionally limited to a time range and category"""
+        query = 'SELECT id, digest, url, category, proxy, fetched_at FROM snapshots WHERE 1=1'
+        params = []
+        if since is not None:
+            query += ' AND fetched_at >= ?'
+            params.append(since)
+        if until is not None:
+            query += ' AND fetched_at < ?'
+            params.append(until)
+        if category:
+            query += ' AND category = ?'
+            params.append(category)
+        query += ' ORDER BY fetched_at, id'
+        return [dict(row) for row in self._connect().execute(query, params)]
+
+    def stats(self):
+        conn = self._connect()
+        blobs = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs').fetchone()
+        snapshots = conn.execute('SELECT COUNT(*), MIN(fetched_at), MAX(fetched_at) FROM snapshots').fetchone()
+        return {
+            'snapshots': snapshots[0],
+            'oldest': snapshots[1],
+            'newest': snapshots[2],
+            'blobs': blobs[0],
+            'size': blobs[1],
+            'stored_size': blobs[2],
+        }
+
+    def prune(self):
+        """Apply the retention and size limits; returns the number of snapshots removed"""
+        conn = self._connect()
+        with conn:
+            cutoff = time.time() - self.retention_days * 86400
+            removed = conn.execute('DELETE FROM snapshots WHERE fetched_at < ?', (cutoff,)).rowcount
+            removed_blobs = self._delete_orphans(conn)
+
+        # Over the size limit: drop the oldest snapshots until it fits
+        stored = self.stats()['stored_size']
+        while stored > self.max_bytes:
+            with conn:
+                oldest = conn.execute('SELECT id FROM snapshots ORDER BY fetched_at, id LIMIT 100').fetchall()
+                if not oldest:
+                    break
+                conn.executemany('DELETE FROM snapshots WHERE id = ?', [(row['id'],) for row in oldest])
+                removed += len(oldest)
+                removed_blobs += self._delete_orphans(conn)
+            stored = self.stats()['stored_size']
+
+        if removed:
+            logger.info("Pruned %d archived snapshots and %d blobs", removed, removed_blobs)
+        return removed
+
+    def _delete_orphans(self, conn):
+        orphans = [row['digest'] for row in conn.execute(
+            'SELECT digest FROM blobs WHERE digest NOT IN (SELECT DISTINCT digest FROM snapshots)')]
+        for digest in orphans:
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+        conn.executemany('DELETE FROM blobs WHERE digest = ?', [(digest,) for digest in orphans])
+        return len(orphans)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or prune the page archive")
+    parser.add_argument('command', choices=['stats', 'prune'])
+    parser.add_argument('--root', help="Archive directory (ARCHIVE_DIR)")
+    args = parser.parse_args()
+
+    configure_logging()
+    archive = PageArchive(root=args.root)
+    if args.command == 'prune':
+        archive.prune()
+    stats = archive.stats()
+    print(f"Snapshots: {stats['snapshots']} of {stats['blobs']} distinct pages")
+    print(f"Size: {stats['size'] / 1024 / 1024:.1f} MB, {stats['stored_size'] / 1024 / 1024:.1f} MB compressed")
+    if stats['oldest']:
+        print(f"Range: {datetime.fromtimestamp(stats['oldest'])} - {datetime.fromtimestamp(stats['newest'])}")
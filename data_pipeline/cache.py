@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import re
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ASIN_PATTERN = re.compile(r'/(?:dp|gp/product)/([A-Z0-9]{10})')
+
+def extract_asin(url):
+    """Amazon product ID from a product URL, or None"""
+    match = ASIN_PATTERN.search(url or '')
+    return match.group(1) if match else None
+
+def cache_invalidation_enabled():
+    return os.getenv('API_CACHE_INVALIDATION', 'true').lower() == 'true'
+
+class ProductCache:
+    """Redis cache for read API responses, invalidated through version keys.
+
+    Every response depends on one or more scopes ("category:laptops",
+    "asin:B0ABCDEFGH"), and its cache key includes the current version of
+    each. The persistence path bumps the versions of the scopes it touched,
+    so stale entries are simply never read again and expire by TTL; nothing
+    has to find and delete them.
+    """
+
+    def __init__(self, redis_client=None, ttl=None, prefix='api'):
+        if redis_client is None:
+            redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+            redis_client = redis.from_url(redis_url)
+        self.redis_client = redis_client
+        self.ttl = ttl or int(os.getenv('API_CACHE_TTL', '300'))
+        self.prefix = prefix
+
+    def _version_key(self, scope):
+        return f"{self.prefix}:version:{scope}"
+
+    def cache_key(self, path, scopes):
+        """Cache key for a request path under the current versions of its scopes"""
+        versions = self.redis_client.mget([self._version_key(scope) for scope in scopes]) if scopes else []
+        tag = ','.join(f"{scope}={int(version or 0)}" for scope, version in zip(scopes, versions))
+        digest = hashlib.sha1(f"{path}|{tag}".encode('utf-8')).hexdigest()
+        return f"{self.prefix}:response:{digest}"
+
+    def get(self, key):
+        """Cached (body, etag) or None"""
+        cached = self.redis_client.get(key)
+        if cached is None:
+            return None
+        entry = json.loads(cached)
+        return entry['body'].encode('utf-8'), entry['etag']
+
+    def set(self, key, body, etag):
+        self.redis_client.set(key, json.dumps({'body': body.decode('utf-8'), 'etag': etag}), ex=self.ttl)
+
+    def invalidate(self, categories=(), asins=()):
+        """Bump the versions of every scope touched by a write"""
+        scopes = [f"category:{category}" for category in set(categories) if category] + \
+                 [f"asin:{asin}" for asin in set(asins) if asin] + ['all']
+        pipe = self.redis_client.pipeline(transaction=False)
+        for scope in scopes:
+            pipe.incr(self._version_key(scope))
+        pipe.execute()
+
+    def invalidate_products(self, products, category=None):
+        """Invalidate the category and ASIN scopes of saved products"""
+        self.invalidate([category or 'unknown'], [extract_asin(product['url']) for product in products])
@@ -0,0 +1,169 @@
+import redis
+import hashlib
+import os
+import re
+import time
+import uuid
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from dotenv import load_dotenv
+from monitoring.metrics import metrics
+
+load_dotenv()
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {'ref', 'ref_', 'qid', 'sr', 'crid', 'sprefix', 'dib', 'dib_tag',
+                   'tag', 'th', 'psc', 'content-id', 'smid', 'spla', 'keywords'}
+TRACKING_PREFIXES = ('utm_', 'pd_rd_', 'pf_rd_')
+
+ASIN_PATH = re.compile(r'/(?:dp|gp/product)/([A-Z0-9]{10})')
+
+# Delete a lease only if we still own it
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def canonicalize_url(url):
+    """Normalize a URL so trivially different links map to the same page"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'https'
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+
+    # Product links carry slugs and ref segments; the ASIN identifies the page
+    asin = ASIN_PATH.search(parts.path)
+    if asin:
+        path = f"/dp/{asin.group(1)}"
+    else:
+        segments = [seg for seg in parts.path.split('/') if seg and not seg.startswith('ref=')]
+        path = '/' + '/'.join(segments)
+
+    params = []
+    for key, value in parse_qsl(parts.query, keep_blank_values=False):
+        if key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES):
+            continue
+        if key == 'page' and value == '1':
+            continue
+        params.append((key, value))
+    params.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(params), ''))
+
+def product_key(url):
+    """Identity of a product link across crawls: its ASIN, or else its canonical URL.
+
+    Search result links carry tracking parameters that change on every
+    crawl, so the raw href can't be compared between crawls.
+    """
+    asin = ASIN_PATH.search(url or '')
+    return asin.group(1) if asin else canonicalize_url(url or '')
+
+class URLFrontier:
+    """Redis-backed URL frontier shared by every producer and worker.
+
+    - pending keys stop the same URL being queued twice while it waits;
+      once a worker takes the job the mark only lives as long as its claim
+    - a time-windowed Bloom filter remembers recently fetched URLs
+    - leases make sure only one worker fetches a URL at a time
+    """
+
+    def __init__(self, redis_client=None):
+        if redis_client is None:
+            redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+            redis_client = redis.from_url(redis_url)
+        self.redis_client = redis_client
+        self.prefix = 'frontier:'
+        self.fetched_ttl = int(os.getenv('FRONTIER_FETCHED_TTL', '3600'))
+        self.pending_ttl = int(os.getenv('FRONTIER_PENDING_TTL', '21600'))
+        # About the stream backend's claim-idle window (QUEUE_CLAIM_IDLE_MS);
+        # workers restart it after every page, so it only needs to cover one
+        self.claim_ttl = int(os.getenv('FRONTIER_CLAIM_TTL', '600'))
+        self.lease_ttl = int(os.getenv('FRONTIER_LEASE_TTL', '300'))
+        self.bloom_bits = int(os.getenv('FRONTIER_BLOOM_BITS', str(2 ** 24)))
+        self.bloom_hashes = int(os.getenv('FRONTIER_BLOOM_HASHES', '7'))
+        self._release_lease = self.redis_client.register_script(RELEASE_LEASE_SCRIPT)
+
+    def _url_hash(self, url):
+        return hashlib.sha256(canonicalize_url(url).encode('utf-8')).hexdigest()
+
+    def _bloom_positions(self, url_hash):
+        # Double hashing: k positions from two 64-bit halves of the digest
+        h1 = int(url_hash[:16], 16)
+        h2 = int(url_hash[16:32], 16) | 1
+        return [(h1 + i * h2) % self.bloom_bits for i in range(self.bloom_hashes)]
+
+    def _bloom_keys(self, now=None):
+        # One filter per TTL window; checking the previous window too means a
+        # URL is remembered for between one and two TTLs
+        window = int((now if now is not None else time.time()) // self.fetched_ttl)
+        return [f"{self.prefix}bloom:{window}", f"{self.prefix}bloom:{window - 1}"]
+
+    def recently_fetched(self, url):
+        """Check whether a URL was fetched within the last TTL window"""
+        positions = self._bloom_positions(self._url_hash(url))
+        pipe = self.redis_client.pipeline(transaction=False)
+        keys = self._bloom_keys()
+        for key in keys:
+            for pos in positions:
+                pipe.getbit(key, pos)
+        bits = pipe.execute()
+        k = len(positions)
+        return any(all(bits[i * k:(i + 1) * k]) for i in range(len(keys)))
+
+    def mark_fetched(self, url):
+        """Remember a URL as recently fetched"""
+        current = self._bloom_keys()[0]
+        pipe = self.redis_client.pipeline(transaction=False)
+        for pos in self._bloom_positions(self._url_hash(url)):
+            pipe.setbit(current, pos, 1)
+        pipe.expire(current, self.fetched_ttl * 2)
+        pipe.execute()
+
+    def admit(self, url, refetch=False):
+        """Decide whether a URL may be queued.
+
+        Rejects URLs already waiting in the queue and, unless `refetch` is set
+        (e.g. a recrawl that is due), URLs fetched recently.
+        """
+        if not refetch and self.recently_fetched(url):
+            metrics.record_frontier_url('recently_fetched')
+            return False
+        pending_key = f"{self.prefix}pending:{self._url_hash(url)}"
+        if not self.redis_client.set(pending_key, 1, nx=True, ex=self.pending_ttl):
+            metrics.record_frontier_url('already_queued')
+            return False
+        metrics.record_frontier_url('admitted')
+        return True
+
+    def hold(self, urls):
+        """Shorten the pending marks of jobs a worker just took to the claim window.
+
+        If the worker dies mid-job, complete() never runs; the mark then
+        expires with the claim instead of blocking the URL for hours. A job
+        reclaimed by another worker is held again when that worker takes it.
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        for url in urls:
+            pipe.set(f"{self.prefix}pending:{self._url_hash(url)}", 1, ex=self.claim_ttl)
+        pipe.execute()
+
+    def acquire(self, url):
+        """Take the in-flight lease for a URL; returns a token or None"""
+        token = uuid.uuid4().hex
+        lease_key = f"{self.prefix}lease:{self._url_hash(url)}"
+        if self.redis_client.set(lease_key, token, nx=True, ex=self.lease_ttl):
+            return token
+        metrics.record_frontier_url('in_flight')
+        return None
+
+    def complete(self, url, token=None, fetched=False):
+        """Finish with a URL: remember it if fetched and drop its lease and pending mark"""
+        url_hash = self._url_hash(url)
+        if fetched:
+            self.mark_fetched(url)
+        if token:
+            self._release_lease(keys=[f"{self.prefix}lease:{url_hash}"], args=[token])
+        self.redis_client.delete(f"{self.prefix}pending:{url_hash}")
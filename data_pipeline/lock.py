@@ -0,0 +1,45 @@
+import uuid
+
+# Extend or release the lock only while we still own it
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class RedisLock:
+    """A Redis lock with a TTL that its owner keeps alive by renewing.
+
+    If the owner dies the lock expires after `ttl` seconds and another
+    process can take it over, which makes it usable for leader election.
+    """
+
+    def __init__(self, redis_client, name, ttl=60):
+        self.redis_client = redis_client
+        self.name = name
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+        self.owned = False
+        self._renew = self.redis_client.register_script(RENEW_SCRIPT)
+        self._release = self.redis_client.register_script(RELEASE_SCRIPT)
+
+    def acquire(self):
+        """Take the lock if it is free, or renew it if we already hold it"""
+        if self.owned and self._renew(keys=[self.name], args=[self.token, int(self.ttl * 1000)]):
+            return True
+        self.owned = bool(self.redis_client.set(self.name, self.token, nx=True, px=int(self.ttl * 1000)))
+        return self.owned
+
+    def release(self):
+        """Release the lock if we hold it"""
+        if self.owned:
+            self._release(keys=[self.name], args=[self.token])
+        self.owned = False
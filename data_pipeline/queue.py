@@ -1,55 +1,335 @@
 import redis
 import json
+import logging
 import os
+import time
+import uuid
 from dotenv import load_dotenv
+from data_pipeline.frontier import URLFrontier
+from data_pipeline.streams import StreamQueueBackend
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+def build_page_url(category_url, page_num):
+    """Build the URL for a given page of a category listing"""
+    if page_num == 1:
+        return category_url
+    separator = "&" if "?" in category_url else "?"
+    return f"{category_url}{separator}page={page_num}"
+
+def get_serializer(name):
+    """Return (dumps, loads) for a queue payload encoding"""
+    if name == 'json':
+        return (lambda data: json.dumps(data, default=str).encode('utf-8'),
+                lambda payload: json.loads(payload))
+    if name == 'msgpack':
+        if msgpack is None:
+            raise ValueError("QUEUE_SERIALIZER=msgpack requires the msgpack package")
+        return (lambda data: msgpack.packb(data, default=str, use_bin_type=True),
+                lambda payload: msgpack.unpackb(payload, raw=False))
+    raise ValueError(f"Unknown queue serializer: {name}")
+
+class ListQueueBackend:
+    """Redis list queue backend: LPUSH to enqueue, BRPOP to dequeue"""
+
+    def __init__(self, redis_client, queue_name, results_queue):
+        self.redis_client = redis_client
+        self.queue_name = queue_name
+        self.results_queue = results_queue
+        self.results_maxlen = int(os.getenv('RESULTS_MAXLEN', '10000'))
+
+    def push_jobs(self, payloads):
+        """Push jobs in one pipelined round trip"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.lpush(self.queue_name, payload)
+        pipe.execute()
+
+    def pop_jobs(self, count=1, timeout=10):
+        """Pop up to `count` jobs, blocking for the first one"""
+        result = self.redis_client.brpop(self.queue_name, timeout=timeout)
+        if not result:
+            return []
+        jobs = [(None, result[1])]
+        if count > 1:
+            # Whatever else is already queued, without blocking
+            pipe = self.redis_client.pipeline(transaction=False)
+            for _ in range(count - 1):
+                pipe.rpop(self.queue_name)
+            jobs.extend((None, payload) for payload in pipe.execute() if payload is not None)
+        return jobs
+
+    def ack(self, msg_ids):
+        """Lists remove jobs on pop, so there is nothing to acknowledge"""
+
+    def push_result(self, payload):
+        """Push a result, keeping only the newest results"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.lpush(self.results_queue, payload)
+        pipe.ltrim(self.results_queue, 0, self.results_maxlen - 1)
+        pipe.execute()
+
+    def size(self):
+        return self.redis_client.llen(self.queue_name)
+
+    def clear(self):
+        self.redis_client.delete(self.queue_name)
+
 class QueueManager:
-    def __init__(self):
+    def __init__(self, backend=None):
         redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
         self.redis_client = redis.from_url(redis_url)
-        self.queue_name = 'scraping_jobs'
-        self.results_queue = 'scraping_results'
+        self.queue_name = os.getenv('SCRAPING_QUEUE_NAME', 'scraping_jobs')
+        self.results_queue = os.getenv('RESULTS_QUEUE_NAME', 'scraping_results')
+        # Parent jobs are tracked in a hash per job until all their pages finish
+        self.parent_prefix = 'scraping_parent:'
+        self.parent_ttl = int(os.getenv('PARENT_JOB_TTL', '86400'))
+        self.frontier = URLFrontier(self.redis_client)
+        
+        self.dumps, self.loads = get_serializer(os.getenv('QUEUE_SERIALIZER', 'json'))
+        backend = backend or os.getenv('QUEUE_BACKEND', 'list')
+        if backend == 'list':
+            self.backend = ListQueueBackend(self.redis_client, self.queue_name, self.results_queue)
+        elif backend == 'stream':
+            # Separate keys so a list queue and a stream never collide
+            self.backend = StreamQueueBackend(self.redis_client, f"{self.queue_name}:stream",
+                                              f"{self.results_queue}:stream")
+        else:
+            raise ValueError(f"Unknown queue backend: {backend}")
     
-    def add_job(self, job_data):
+    def add_job(self, job_data, dedupe=True):
         """Add a scraping job to the queue"""
         try:
-            job_json = json.dumps(job_data)
-            self.redis_client.lpush(self.queue_name, job_json)
-            print(f"Added job to queue: {job_data.get('url', 'Unknown URL')}")
+            url = job_data.get('url')
+            if dedupe and url and not self.frontier.admit(url):
+                logger.info("Skipped duplicate job: %s", url)
+                return False
+            self.backend.push_jobs([self.dumps(job_data)])
+            logger.info("Added job to queue: %s", job_data.get('url', 'Unknown URL'))
             return True
         except Exception as e:
-            print(f"Error adding job to queue: {e}")
+            logger.error("Error adding job to queue: %s", e)
             return False
     
+    def add_jobs(self, jobs, dedupe=True):
+        """Add several jobs in one pipelined round trip; returns how many were queued"""
+        try:
+            if dedupe:
+                jobs = [job for job in jobs if not job.get('url') or self.frontier.admit(job['url'])]
+            if jobs:
+                self.backend.push_jobs([self.dumps(job) for job in jobs])
+            logger.info("Added %d jobs to queue", len(jobs))
+            return len(jobs)
+        except Exception as e:
+            logger.error("Error adding jobs to queue: %s", e)
+            return 0
+    
     def get_job(self, timeout=10):
         """Get next job from queue (blocking)"""
+        jobs = self.get_jobs(count=1, timeout=timeout)
+        return jobs[0] if jobs else None
+    
+    def get_jobs(self, count=1, timeout=10):
+        """Get up to `count` jobs from queue, blocking until at least one arrives.
+
+        Jobs must be passed to ack_job once processed.
+        """
+        try:
+            jobs = []
+            for msg_id, payload in self.backend.pop_jobs(count=count, timeout=timeout):
+                job = self.loads(payload)
+                if msg_id:
+                    job['_msg_id'] = msg_id
+                jobs.append(job)
+        except Exception as e:
+            logger.error("Error getting job from queue: %s", e)
+            return []
+        # The jobs are already off the queue; failing to hold them must not lose them
+        self.hold_jobs(jobs)
+        return jobs
+    
+    def hold_jobs(self, jobs):
+        """Restart the claim window on the pending marks of jobs being worked on.
+
+        Called when jobs are taken and again as a long job makes progress, so
+        the mark outlives the claim only while the worker is still alive.
+        """
+        urls = [job['url'] for job in jobs if job.get('url')]
+        if not urls:
+            return
+        try:
+            self.frontier.hold(urls)
+        except Exception as e:
+            logger.error("Error holding pending marks for %d jobs: %s", len(urls), e)
+    
+    def ack_job(self, job):
+        """Acknowledge a processed job so it isn't redelivered"""
+        msg_id = job.pop('_msg_id', None)
+        if msg_id:
+            try:
+                self.backend.ack([msg_id])
+            except Exception as e:
+                logger.error("Error acknowledging job: %s", e)
+    
+    def add_category_job(self, job_data, dedupe=True, refetch=False):
+        """Split a category job into page-level tasks that any worker can take"""
         try:
-            result = self.redis_client.brpop(self.queue_name, timeout=timeout)
-            if result:
-                job_json = result[1].decode('utf-8')
-                return json.loads(job_json)
+            parent_id = job_data.get('job_id') or uuid.uuid4().hex
+            max_pages = int(job_data.get('max_pages', 1))
+            parent_key = self.parent_prefix + parent_id
+
+            page_jobs = []
+            for page_num in range(1, max_pages + 1):
+                page_job = {k: v for k, v in job_data.items() if k != 'max_pages'}
+                page_job.update({
+                    'parent_id': parent_id,
+                    'page': page_num,
+                    'url': build_page_url(job_data['url'], page_num),
+                })
+                # Pages already queued or fetched recently are left out
+                if dedupe and not self.frontier.admit(page_job['url'], refetch=refetch):
+                    continue
+                page_jobs.append(page_job)
+
+            if not page_jobs:
+                logger.info("Skipped duplicate job: %s", job_data.get('url', 'Unknown URL'))
+                return None
+
+            # Register the parent before any child can finish
+            pipe = self.redis_client.pipeline()
+            pipe.hset(parent_key, mapping={
+                'job': json.dumps(dict(job_data, job_id=parent_id)),
+                'total_pages': len(page_jobs),
+                'pages_done': 0,
+                'pages_failed': 0,
+                'pages_skipped': 0,
+                'products_found': 0,
+                'created_at': time.time(),
+            })
+            pipe.expire(parent_key, self.parent_ttl)
+            pipe.execute()
+            self.backend.push_jobs([self.dumps(page_job) for page_job in page_jobs])
+
+            logger.info("Added job %s to queue as %d page tasks: %s", parent_id, len(page_jobs),
+                        job_data.get('url', 'Unknown URL'))
+            return parent_id
+        except Exception as e:
+            logger.error("Error adding category job to queue: %s", e)
             return None
+
+    def record_page_result(self, page_job, products_found, success=True, changed=False, skipped=False):
+        """Record a finished page task against its parent job.
+
+        Returns the parent's aggregated result once every page has finished,
+        otherwise None. The aggregated result is pushed to the results queue
+        exactly once, by whichever worker finishes the last page.
+        """
+        parent_key = self.parent_prefix + page_job['parent_id']
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hincrby(parent_key, 'products_found', products_found)
+            if skipped:
+                pipe.hincrby(parent_key, 'pages_skipped', 1)
+            else:
+                pipe.hincrby(parent_key, 'pages_done' if success else 'pages_failed', 1)
+            if changed:
+                pipe.hset(parent_key, 'changed', 1)
+            pipe.hmget(parent_key, 'total_pages', 'pages_done', 'pages_failed', 'pages_skipped')
+            total, done, failed, skipped_count = pipe.execute()[-1]
+
+            finished = sum(int(count or 0) for count in (done, failed, skipped_count))
+            if total is None or finished < int(total):
+                return None
+
+            # Only one worker gets to finalize the parent
+            if not self.redis_client.hsetnx(parent_key, 'finalized', 1):
+                return None
+
+            return self._finalize_parent(parent_key)
         except Exception as e:
-            print(f"Error getting job from queue: {e}")
+            logger.error("Error recording page result: %s", e)
             return None
-    
+
+    def _finalize_parent(self, parent_key):
+        """Build the parent's aggregated result and publish it"""
+        state = {k.decode('utf-8'): v.decode('utf-8') for k, v in self.redis_client.hgetall(parent_key).items()}
+        job = json.loads(state['job'])
+        products_found = int(state['products_found'])
+        pages_failed = int(state['pages_failed'])
+        pages_skipped = int(state.get('pages_skipped', 0))
+
+        if not products_found and pages_skipped == int(state['total_pages']):
+            status = 'skipped'
+        elif products_found and pages_failed:
+            status = 'partial'
+        elif products_found:
+            status = 'completed'
+        else:
+            status = 'failed'
+
+        result = {
+            'job': job,
+            'job_id': job['job_id'],
+            'products_found': products_found,
+            'pages_total': int(state['total_pages']),
+            'pages_failed': pages_failed,
+            'pages_skipped': pages_skipped,
+            'changed': state.get('changed') == '1',
+            'status': status,
+            'duration': time.time() - float(state['created_at']),
+            'timestamp': time.time()
+        }
+        self.add_result(result)
+        self.redis_client.hset(parent_key, 'status', status)
+        return result
+
+    def set_parent_last_page(self, parent_id, last_page):
+        """Record the real last page of a fanned-out job, keeping the lowest seen"""
+        parent_key = self.parent_prefix + parent_id
+        try:
+            current = self.redis_client.hget(parent_key, 'last_page')
+            if current is None or last_page < int(current):
+                self.redis_client.hset(parent_key, 'last_page', last_page)
+        except Exception as e:
+            logger.error("Error recording last page: %s", e)
+
+    def page_beyond_last(self, page_job):
+        """Check whether a page task is past its parent's known last page"""
+        try:
+            last_page = self.redis_client.hget(self.parent_prefix + page_job['parent_id'], 'last_page')
+            return last_page is not None and page_job.get('page', 1) > int(last_page)
+        except Exception as e:
+            logger.error("Error checking last page: %s", e)
+            return False
+
+    def get_parent_status(self, parent_id):
+        """Get the progress of a fanned-out job"""
+        state = self.redis_client.hgetall(self.parent_prefix + parent_id)
+        if not state:
+            return None
+        return {k.decode('utf-8'): v.decode('utf-8') for k, v in state.items()}
+
     def add_result(self, result_data):
         """Add scraping result to results queue"""
         try:
-            result_json = json.dumps(result_data, default=str)
-            self.redis_client.lpush(self.results_queue, result_json)
+            self.backend.push_result(self.dumps(result_data))
             return True
         except Exception as e:
-            print(f"Error adding result to queue: {e}")
+            logger.error("Error adding result to queue: %s", e)
             return False
     
     def get_queue_size(self):
         """Get number of jobs in queue"""
-        return self.redis_client.llen(self.queue_name)
+        return self.backend.size()
     
     def clear_queue(self):
         """Clear all jobs from queue"""
-        self.redis_client.delete(self.queue_name)
-        print("Queue cleared")
+        self.backend.clear()
+        logger.info("Queue cleared")
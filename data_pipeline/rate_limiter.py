@@ -0,0 +1,126 @@
+import redis
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from monitoring.metrics import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Reserve tokens from a bucket refilled at `rate` per second up to `burst`.
+# The bucket may go negative: a caller that has to wait gets a reservation
+# and sleeps exactly until its turn instead of polling. Redis TIME keeps every
+# worker on the same clock.
+RESERVE_SCRIPT = """
+redis.replicate_commands()
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens < requested then
+    wait = (requested - tokens) / rate
+end
+if max_wait >= 0 and wait > max_wait then
+    return {0, tostring(wait)}
+end
+
+tokens = tokens - requested
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {1, tostring(wait)}
+"""
+
+class RedisTokenBucket:
+    """Token buckets shared by every worker through an atomic Redis script"""
+
+    def __init__(self, redis_client=None):
+        if redis_client is None:
+            redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+            redis_client = redis.from_url(redis_url)
+        self.redis_client = redis_client
+        self._reserve = self.redis_client.register_script(RESERVE_SCRIPT)
+
+    def reserve(self, key, rate, burst, tokens=1, max_wait=None):
+        """Reserve tokens; returns (granted, seconds to wait before using them)"""
+        granted, wait = self._reserve(keys=[key], args=[rate, burst, tokens,
+                                                        -1 if max_wait is None else max_wait])
+        return bool(granted), float(wait)
+
+class LocalTokenBucket:
+    """In-process stand-in for RedisTokenBucket, for tests and single workers"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key, rate, burst, tokens=1, max_wait=None):
+        """Reserve tokens; returns (granted, seconds to wait before using them)"""
+        with self._lock:
+            now = self.clock()
+            available, ts = self._buckets.get(key, (burst, now))
+            available = min(burst, available + max(0, now - ts) * rate)
+
+            wait = (tokens - available) / rate if available < tokens else 0.0
+            if max_wait is not None and wait > max_wait:
+                return False, wait
+
+            self._buckets[key] = (available - tokens, now)
+            return True, wait
+
+class RateLimiter:
+    """Cluster-wide request rate limit per target host (and optionally per proxy)"""
+
+    def __init__(self, bucket=None, rate=None, burst=None, per_proxy=None):
+        if bucket is None:
+            backend = os.getenv('RATE_LIMIT_BACKEND', 'redis')
+            bucket = LocalTokenBucket() if backend == 'local' else RedisTokenBucket()
+        self.bucket = bucket
+        # Defaults match the old 2-5 s delay between pages of a single worker
+        self.rate = rate or float(os.getenv('RATE_LIMIT_RATE', '0.3'))
+        self.burst = burst or float(os.getenv('RATE_LIMIT_BURST', '2'))
+        if per_proxy is None:
+            per_proxy = os.getenv('RATE_LIMIT_PER_PROXY', 'false').lower() == 'true'
+        self.per_proxy = per_proxy
+
+    def _key(self, host, proxy=None):
+        if self.per_proxy and proxy:
+            return f"ratelimit:{host}:{proxy}"
+        return f"ratelimit:{host}"
+
+    def acquire(self, url, proxy=None, tokens=1, timeout=None):
+        """Wait for permission to request `url`.
+
+        Returns False without waiting if the wait would exceed `timeout`.
+        """
+        host = urlsplit(url).hostname or url
+        try:
+            granted, wait = self.bucket.reserve(self._key(host, proxy), self.rate, self.burst,
+                                                tokens=tokens, max_wait=timeout)
+        except Exception as e:
+            # Never stop crawling because the limiter is unreachable
+            logger.warning("Rate limiter unavailable, continuing without it: %s", e)
+            metrics.record_error('rate_limiter_failed')
+            return True
+
+        if not granted:
+            metrics.record_rate_limit(host, 'denied', 0)
+            return False
+
+        if wait > 0:
+            time.sleep(wait)
+        metrics.record_rate_limit(host, 'granted', wait)
+        return True
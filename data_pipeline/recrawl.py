@@ -0,0 +1,139 @@
+import redis
+import hashlib
+import json
+import os
+import time
+from dotenv import load_dotenv
+from data_pipeline.frontier import product_key
+
+load_dotenv()
+
+# Claim every overdue target (most overdue first) and push its due time out by
+# a lease, so a dispatcher that dies mid-run doesn't lose the target for good.
+POP_DUE_SCRIPT = """
+local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+for i = 1, #items, 2 do
+    redis.call('ZADD', KEYS[1], ARGV[3], items[i])
+end
+return items
+"""
+
+def fingerprint_products(products):
+    """Stable fingerprint of the products and prices seen on a page.
+
+    Products are identified by ASIN (or canonical URL), not the raw link,
+    whose tracking parameters differ on every crawl.
+    """
+    digest = hashlib.sha1()
+    for key, price in sorted((product_key(p.get('url')), p.get('price') or '') for p in products):
+        digest.update(f"{key}\t{price}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+class RecrawlScheduler:
+    """Freshness-driven recrawl schedule kept in a Redis sorted set.
+
+    Each target (a category, query or page) has a next-due timestamp as its
+    score. Targets whose pages change get crawled more often, targets that
+    stay the same back off, within [min_interval, max_interval].
+    """
+
+    def __init__(self, redis_client=None):
+        if redis_client is None:
+            redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+            redis_client = redis.from_url(redis_url)
+        self.redis_client = redis_client
+        self.due_key = 'recrawl_due'
+        self.target_prefix = 'recrawl_target:'
+        self.fingerprint_prefix = 'recrawl_fp:'
+        self.min_interval = float(os.getenv('RECRAWL_MIN_INTERVAL', '900'))
+        self.max_interval = float(os.getenv('RECRAWL_MAX_INTERVAL', '86400'))
+        self.default_interval = float(os.getenv('RECRAWL_DEFAULT_INTERVAL', '21600'))
+        self.speedup = float(os.getenv('RECRAWL_SPEEDUP', '0.5'))
+        self.backoff = float(os.getenv('RECRAWL_BACKOFF', '1.5'))
+        self.claim_lease = float(os.getenv('RECRAWL_CLAIM_LEASE', '3600'))
+        self._pop_due = self.redis_client.register_script(POP_DUE_SCRIPT)
+
+    def _clamp(self, interval):
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def register(self, target_id, job_data, interval=None, due_at=None):
+        """Register a recrawl target, keeping its schedule if it already exists"""
+        target_key = self.target_prefix + target_id
+        pipe = self.redis_client.pipeline()
+        pipe.hset(target_key, 'job', json.dumps(job_data))
+        pipe.hsetnx(target_key, 'interval', self._clamp(interval or self.default_interval))
+        # NX so restarting the scheduler doesn't reset learned due times
+        pipe.zadd(self.due_key, {target_id: due_at if due_at is not None else time.time()}, nx=True)
+        pipe.execute()
+
+    def unregister(self, target_id):
+        """Stop recrawling a target"""
+        pipe = self.redis_client.pipeline()
+        pipe.zrem(self.due_key, target_id)
+        pipe.delete(self.target_prefix + target_id, self.fingerprint_prefix + target_id)
+        pipe.execute()
+
+    def pop_due(self, limit=10, now=None):
+        """Claim up to `limit` overdue targets, most overdue first.
+
+        Returns a list of (target_id, job_data, overdue_seconds).
+        """
+        if limit <= 0:
+            return []
+        now = now if now is not None else time.time()
+        items = self._pop_due(keys=[self.due_key], args=[now, limit, now + self.claim_lease])
+
+        due = []
+        for i in range(0, len(items), 2):
+            target_id = items[i].decode('utf-8')
+            job_json = self.redis_client.hget(self.target_prefix + target_id, 'job')
+            if job_json is None:
+                # Target was unregistered; drop the stale schedule entry
+                self.redis_client.zrem(self.due_key, target_id)
+                continue
+            due.append((target_id, json.loads(job_json), now - float(items[i + 1])))
+        return due
+
+    def page_changed(self, target_id, page_num, products):
+        """Compare a page against the last crawl and remember the new state"""
+        fingerprint = fingerprint_products(products)
+        fingerprint_key = self.fingerprint_prefix + target_id
+        previous = self.redis_client.hget(fingerprint_key, page_num)
+        if previous is not None and previous.decode('utf-8') == fingerprint:
+            return False
+        self.redis_client.hset(fingerprint_key, page_num, fingerprint)
+        return True
+
+    def reschedule(self, target_id, changed, now=None):
+        """Adapt a target's interval to its change rate and set its next due time.
+
+        `changed=None` (e.g. the crawl failed) keeps the current interval.
+        """
+        now = now if now is not None else time.time()
+        target_key = self.target_prefix + target_id
+        interval = self.redis_client.hget(target_key, 'interval')
+        interval = float(interval) if interval is not None else self.default_interval
+
+        if changed is True:
+            interval = self._clamp(interval * self.speedup)
+        elif changed is False:
+            interval = self._clamp(interval * self.backoff)
+
+        pipe = self.redis_client.pipeline()
+        pipe.hset(target_key, mapping={'interval': interval, 'last_crawled': now})
+        pipe.zadd(self.due_key, {target_id: now + interval})
+        pipe.execute()
+        return interval
+
+    def get_schedule(self, limit=100):
+        """List targets with their next due time and current interval"""
+        schedule = []
+        for target_id, due_at in self.redis_client.zrange(self.due_key, 0, limit - 1, withscores=True):
+            target_id = target_id.decode('utf-8')
+            interval = self.redis_client.hget(self.target_prefix + target_id, 'interval')
+            schedule.append({
+                'target': target_id,
+                'due_at': due_at,
+                'interval': float(interval) if interval is not None else None,
+            })
+        return schedule
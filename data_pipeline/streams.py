@@ -0,0 +1,93 @@
+import redis
+import os
+import socket
+
+class StreamQueueBackend:
+    """Redis Streams queue backend with a consumer group.
+
+    Jobs are delivered with XREADGROUP and stay pending until acknowledged,
+    so a crashed worker's jobs are reclaimed by the others. Results go to a
+    stream capped with MAXLEN.
+    """
+
+    def __init__(self, redis_client, stream, results_stream, group=None, consumer=None):
+        self.redis_client = redis_client
+        self.stream = stream
+        self.results_stream = results_stream
+        self.group = group or os.getenv('QUEUE_STREAM_GROUP', 'scraper_workers')
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.results_maxlen = int(os.getenv('RESULTS_MAXLEN', '10000'))
+        # Jobs pending this long were most likely lost with their worker
+        self.claim_idle_ms = int(os.getenv('QUEUE_CLAIM_IDLE_MS', '600000'))
+        self._group_ready = False
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.redis_client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def push_jobs(self, payloads):
+        """Append jobs to the stream in one pipelined round trip"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.xadd(self.stream, {'d': payload})
+        pipe.execute()
+
+    def pop_jobs(self, count=1, timeout=10):
+        """Read up to `count` jobs for this consumer; returns (message id, payload) pairs"""
+        try:
+            return self._read_jobs(count, timeout)
+        except redis.ResponseError as e:
+            if 'NOGROUP' not in str(e):
+                raise
+            # Another process cleared the stream and its group since we
+            # created it; recreate the group rather than reading nothing forever
+            self._group_ready = False
+            return self._read_jobs(count, timeout)
+
+    def _read_jobs(self, count, timeout):
+        self._ensure_group()
+
+        # Take over jobs left pending by crashed consumers first
+        claimed = self.redis_client.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=self.claim_idle_ms, start_id='0-0', count=count
+        )
+        messages = claimed[1]
+
+        if not messages:
+            response = self.redis_client.xreadgroup(
+                self.group, self.consumer, {self.stream: '>'},
+                count=count, block=int(timeout * 1000) if timeout else None
+            )
+            messages = response[0][1] if response else []
+
+        return [(msg_id.decode('utf-8'), fields[b'd']) for msg_id, fields in messages if fields]
+
+    def ack(self, msg_ids):
+        """Acknowledge finished jobs and drop them from the stream"""
+        if not msg_ids:
+            return
+        pipe = self.redis_client.pipeline()
+        pipe.xack(self.stream, self.group, *msg_ids)
+        pipe.xdel(self.stream, *msg_ids)
+        pipe.execute()
+
+    def push_result(self, payload):
+        """Append a result, trimming the results stream to its cap"""
+        self.redis_client.xadd(self.results_stream, {'d': payload},
+                               maxlen=self.results_maxlen, approximate=True)
+
+    def size(self):
+        """Number of jobs waiting or in progress"""
+        return self.redis_client.xlen(self.stream)
+
+    def clear(self):
+        """Drop the stream along with its consumer group"""
+        self.redis_client.delete(self.stream)
+        self._group_ready = False
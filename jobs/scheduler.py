@@ -6,23 +6,61 @@ import os
 from datetime import datetime
 import signal
 import time
+import json
+import uuid
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from crawler.scraper import scrape_category
 from data_pipeline.database import DatabaseManager
 from data_pipeline.queue import QueueManager
+from data_pipeline.recrawl import RecrawlScheduler
+from data_pipeline.lock import RedisLock
 from monitoring.metrics import metrics
 from monitoring.alerts import alert_manager
+from monitoring.logging_setup import configure_logging
+
+# Categories crawled by the scheduler
+SCRAPING_JOBS = [
+    {
+        'url': 'https://www.amazon.in/s?k=laptop',
+        'category': 'laptops',
+        'max_pages': 2  # Reduced for stability
+    },
+    {
+        'url': 'https://www.amazon.in/s?k=smartphone',
+        'category': 'smartphones', 
+        'max_pages': 2
+    },
+    {
+        'url': 'https://www.amazon.in/s?k=headphones',
+        'category': 'headphones',
+        'max_pages': 2
+    }
+]
 
 class ScrapingScheduler:
     def __init__(self):
         self.scheduler = BlockingScheduler()
         self.db_manager = None
         self.queue_manager = None
+        self.recrawl = None
         self.running = False
         
+        # Adaptive recrawl replaces the fixed 6-hour cron unless disabled
+        self.adaptive_recrawl = os.getenv('RECRAWL_ADAPTIVE', 'true').lower() == 'true'
+        self.recrawl_max_queue_depth = int(os.getenv('RECRAWL_MAX_QUEUE_DEPTH', '20'))
+        
+        # Only the replica holding the leader lock fires jobs
+        self.leader_lock = None
+        self.leader_ttl = int(os.getenv('SCHEDULER_LEADER_TTL', '60'))
+        # A run still unfinished after this long is abandoned so the next can start
+        self.run_timeout = int(os.getenv('SCHEDULER_RUN_TIMEOUT', '21600'))
+        self.active_run_key = 'scheduler:active_run'
+        # Recrawl batches are tracked on their own and never hold the run slot
+        self.recrawl_runs_key = 'scheduler:recrawl_runs'
+        self.run_prefix = 'scheduler_run:'
+        
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -42,6 +80,15 @@ class ScrapingScheduler:
             self.queue_manager = QueueManager()
             print("✅ Queue manager initialized successfully")
             
+            self.leader_lock = RedisLock(self.queue_manager.redis_client, 'scheduler:leader', ttl=self.leader_ttl)
+            self.leader_heartbeat()
+            
+            if self.adaptive_recrawl:
+                self.recrawl = RecrawlScheduler(self.queue_manager.redis_client)
+                for job in SCRAPING_JOBS:
+                    self.recrawl.register(job['category'], job)
+                print(f"✅ Recrawl scheduler initialized with {len(SCRAPING_JOBS)} targets")
+            
             # Start metrics server if not already running
             metrics.start_metrics_server()
             print("✅ Metrics server initialized")
@@ -52,96 +99,200 @@ class ScrapingScheduler:
             print(f"❌ Failed to initialize services: {e}")
             return False
     
+    def leader_heartbeat(self):
+        """Take or renew the leader lock; only the leader fires jobs"""
+        was_leader = self.leader_lock.owned
+        try:
+            is_leader = self.leader_lock.acquire()
+        except Exception as e:
+            print(f"Leader election failed: {e}")
+            metrics.record_error('leader_election_failed')
+            is_leader = self.leader_lock.owned = False
+        
+        if is_leader and not was_leader:
+            print("👑 This scheduler replica is now the leader")
+        elif was_leader and not is_leader:
+            print("⚠️  Lost scheduler leadership")
+        return is_leader
+    
+    def _is_leader(self, job_name):
+        if self.leader_lock and self.leader_lock.owned:
+            return True
+        print(f"Skipping {job_name}: another scheduler replica is the leader")
+        return False
+    
     def scheduled_scrape_job(self):
-        """Main scheduled scraping job"""
-        job_start_time = datetime.now()
-        print(f"\n=== Starting scheduled scrape at {job_start_time} ===")
-        
-        # Define scraping jobs
-        scraping_jobs = [
-            {
-                'url': 'https://www.amazon.in/s?k=laptop',
-                'category': 'laptops',
-                'max_pages': 2  # Reduced for stability
-            },
-            {
-                'url': 'https://www.amazon.in/s?k=smartphone',
-                'category': 'smartphones', 
-                'max_pages': 2
-            },
-            {
-                'url': 'https://www.amazon.in/s?k=headphones',
-                'category': 'headphones',
-                'max_pages': 2
-            }
-        ]
-        
-        total_products = 0
-        successful_jobs = 0
-        
-        for job in scraping_jobs:
+        """Main scheduled scraping job: enqueue every category for the worker fleet"""
+        if not self._is_leader('scheduled scrape'):
+            return
+        
+        run_id = self._begin_run('scheduled scrape')
+        if not run_id:
+            return
+        
+        print(f"\n=== Starting scheduled scrape run {run_id} at {datetime.now()} ===")
+        
+        parents = {}
+        for job in SCRAPING_JOBS:
             try:
-                print(f"\n--- Scraping {job['category'].upper()} ---")
-                
-                # Record request start
-                metrics.record_request('started', job['category'])
-                
-                # Scrape category
-                products = scrape_category(
-                    category_url=job['url'],
-                    max_pages=job['max_pages'],
-                    use_proxy=False,
-                    db_manager=self.db_manager,
-                    category_name=job['category']
-                )
-                
-                # Record metrics
-                if products:
-                    metrics.record_products_scraped(len(products), job['category'])
-                    metrics.record_request('success', job['category'])
-                    total_products += len(products)
-                    successful_jobs += 1
-                    print(f"✅ Scraped {len(products)} products from {job['category']}")
-                else:
-                    metrics.record_request('failed', job['category'])
-                    print(f"❌ No products found for {job['category']}")
-                
-                # Add delay between categories to be respectful
-                time.sleep(10)
-                
+                parent_id = self.queue_manager.add_category_job(dict(job, job_id=f"{run_id}-{job['category']}"))
+                if parent_id:
+                    parents[job['category']] = parent_id
+                    metrics.record_request('started', job['category'])
             except Exception as e:
-                print(f"❌ Error scraping {job['category']}: {e}")
+                print(f"❌ Error enqueuing {job['category']}: {e}")
                 metrics.record_error('scraping_failed')
-                metrics.record_request('failed', job['category'])
-                
-                # Send alert for failed scraping
-                try:
-                    alert_manager.send_email_alert(
-                        f"Scraping Failed: {job['category']}", 
-                        f"Error: {str(e)}"
-                    )
-                except:
-                    print("Failed to send alert email")
-        
-        job_end_time = datetime.now()
-        duration = job_end_time - job_start_time
-        
-        print(f"\n=== Scheduled scrape completed ===")
-        print(f"Duration: {duration}")
+        
+        if self._register_run(run_id, parents):
+            print(f"Enqueued {len(parents)} categories for run {run_id}")
+        else:
+            self.queue_manager.redis_client.delete(self.active_run_key)
+            print("Nothing to scrape this run")
+    
+    def _begin_run(self, job_name):
+        """Claim the active run slot; returns a new run ID, or None while a run is in progress"""
+        # Never start a run while the previous one is still being worked on
+        active_run = self.queue_manager.redis_client.get(self.active_run_key)
+        if active_run:
+            print(f"Skipping {job_name}: run {active_run.decode('utf-8')} is still in progress")
+            metrics.record_request('run_skipped_overlap', 'scheduler')
+            return None
+        
+        run_id = uuid.uuid4().hex[:12]
+        # NX guards against another replica that believes it is leader. The
+        # TTL is only a safety net: track_active_run times runs out itself
+        if not self.queue_manager.redis_client.set(self.active_run_key, run_id, nx=True, ex=self.run_timeout * 2):
+            print(f"Skipping {job_name}: another run just started")
+            return None
+        return run_id
+    
+    def _register_run(self, run_id, parents):
+        """Record the parent jobs of a started run for tracking; False if there are none"""
+        if not parents:
+            return False
+        self.queue_manager.redis_client.hset(self.run_prefix + run_id, mapping={
+            'parents': json.dumps(parents),
+            'started_at': time.time(),
+        })
+        self.queue_manager.redis_client.expire(self.run_prefix + run_id, self.run_timeout * 2)
+        return True
+    
+    def track_active_run(self):
+        """Check whether the active run and any recrawl batches have finished and report on them"""
+        if not self._is_leader('run tracking'):
+            return
+        
+        redis_client = self.queue_manager.redis_client
+        active_run = redis_client.get(self.active_run_key)
+        if active_run and self._check_run(active_run.decode('utf-8')):
+            redis_client.delete(self.active_run_key)
+        
+        for run_id in redis_client.smembers(self.recrawl_runs_key):
+            # A batch whose record has expired is dropped too
+            if self._check_run(run_id.decode('utf-8')) is not False:
+                redis_client.srem(self.recrawl_runs_key, run_id)
+    
+    def _check_run(self, run_id):
+        """Report on a run if it has finished or timed out.
+
+        Returns True once the run is over, False while it is still going and
+        None if there is no record of it (yet).
+        """
+        run = self.queue_manager.redis_client.hgetall(self.run_prefix + run_id)
+        if not run:
+            return None
+        parents = json.loads(run[b'parents'])
+        started_at = float(run[b'started_at'])
+        
+        statuses = {}
+        unfinished = []
+        for category, parent_id in parents.items():
+            state = self.queue_manager.get_parent_status(parent_id)
+            if state is None or 'status' not in state:
+                unfinished.append(category)
+            else:
+                statuses[category] = state
+        
+        if unfinished:
+            if time.time() - started_at <= self.run_timeout:
+                return False  # Still running
+            # A lost page task leaves its parent without a status for good
+            print(f"\n=== Scrape run {run_id} timed out after {self.run_timeout}s ===")
+            print(f"Unfinished: {', '.join(unfinished)}")
+            metrics.record_request('run_timed_out', 'scheduler')
+            try:
+                alert_manager.send_alert(
+                    'scheduler_run_timeout',
+                    f"Scrape run {run_id} timed out",
+                    f"Run {run_id} was abandoned after {self.run_timeout}s; still unfinished: "
+                    f"{', '.join(unfinished)}",
+                )
+            except Exception as e:
+                print(f"Failed to send alert: {e}")
+            self.queue_manager.redis_client.hset(self.run_prefix + run_id, 'timed_out_at', time.time())
+            return True
+        
+        total_products = sum(int(state['products_found']) for state in statuses.values())
+        failed = [category for category, state in statuses.items() if state['status'] == 'failed']
+        
+        print(f"\n=== Scrape run {run_id} completed ===")
+        print(f"Duration: {time.time() - started_at:.0f}s")
         print(f"Total products: {total_products}")
-        print(f"Successful jobs: {successful_jobs}/{len(scraping_jobs)}")
+        print(f"Successful jobs: {len(statuses) - len(failed)}/{len(statuses)}")
+        
+        for category in failed:
+            # Send alert for failed scraping
+            try:
+                alert_manager.send_email_alert(
+                    f"Scraping Failed: {category}", 
+                    f"Run {run_id} found no products for {category}"
+                )
+            except:
+                print("Failed to send alert email")
         
         # Record job completion metrics
         metrics.record_request('job_completed', 'scheduler')
+        self.queue_manager.redis_client.hset(self.run_prefix + run_id, 'completed_at', time.time())
         
         # Health check
         try:
             alert_manager.check_scraper_health(self.db_manager)
         except Exception as e:
             print(f"Health check failed: {e}")
+        return True
+    
+    def dispatch_due_recrawls(self):
+        """Enqueue the most overdue recrawl targets for the worker fleet"""
+        if not self._is_leader('recrawl dispatch'):
+            return
+        # Each dispatched batch is tracked as a run of its own. Batches may
+        # overlap: targets fall due independently and the queue depth cap
+        # already bounds how much is in flight
+        run_id = uuid.uuid4().hex[:12]
+        parents = {}
+        try:
+            # Keep the queue short so priority order is preserved
+            capacity = self.recrawl_max_queue_depth - self.queue_manager.get_queue_size()
+            for target_id, job, overdue in self.recrawl.pop_due(limit=capacity):
+                job = dict(job, recrawl_target=target_id, job_id=f"{run_id}-{target_id}")
+                # The target is due, so its pages may be refetched
+                parent_id = self.queue_manager.add_category_job(job, refetch=True)
+                if parent_id:
+                    parents[target_id] = parent_id
+                print(f"Dispatched recrawl of {target_id} ({overdue:.0f}s overdue)")
+                metrics.record_request('recrawl_dispatched', job.get('category', target_id))
+        except Exception as e:
+            print(f"Recrawl dispatch failed: {e}")
+            metrics.record_error('recrawl_dispatch_failed')
+        finally:
+            if self._register_run(run_id, parents):
+                self.queue_manager.redis_client.sadd(self.recrawl_runs_key, run_id)
+                print(f"Dispatched {len(parents)} recrawls as run {run_id}")
     
     def quick_health_check(self):
         """Quick health check job"""
+        if not self._is_leader('health check'):
+            return
         try:
             print("Running health check...")
             alert_manager.check_scraper_health(self.db_manager)
@@ -152,14 +303,50 @@ class ScrapingScheduler:
     
     def add_jobs(self):
         """Add scheduled jobs"""
-        # Main scraping job - every 6 hours
+        if self.adaptive_recrawl:
+            # Pull overdue targets every minute; intervals adapt to change rate
+            self.scheduler.add_job(
+                func=self.dispatch_due_recrawls,
+                trigger=IntervalTrigger(minutes=1),
+                id='recrawl_dispatch',
+                name='Adaptive Recrawl Dispatch',
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+        else:
+            # Main scraping job - every 6 hours
+            self.scheduler.add_job(
+                func=self.scheduled_scrape_job,
+                trigger=CronTrigger(hour='*/6', minute=0),  # Every 6 hours at minute 0
+                id='main_scraping_job',
+                name='Amazon Product Scraping',
+                replace_existing=True,
+                max_instances=1,
+                misfire_grace_time=600  # 10 minutes grace time
+            )
+            
+        
+        # Finish runs once every category's pages are done, or time them out
+        self.scheduler.add_job(
+            func=self.track_active_run,
+            trigger=IntervalTrigger(seconds=30),
+            id='run_tracking',
+            name='Scrape Run Tracking',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        
+        # Keep (or take over) scheduler leadership
         self.scheduler.add_job(
-            func=self.scheduled_scrape_job,
-            trigger=CronTrigger(hour='*/6', minute=0),  # Every 6 hours at minute 0
-            id='main_scraping_job',
-            name='Amazon Product Scraping',
+            func=self.leader_heartbeat,
+            trigger=IntervalTrigger(seconds=max(1, self.leader_ttl // 3)),
+            id='leader_heartbeat',
+            name='Leader Election',
             replace_existing=True,
-            misfire_grace_time=600  # 10 minutes grace time
+            max_instances=1,
+            coalesce=True
         )
         
         # Health check every hour
@@ -202,8 +389,12 @@ class ScrapingScheduler:
             print("\nPress Ctrl+C to stop scheduler")
             
             # Run one immediate scrape for testing
-            print("\n🚀 Running initial scrape job...")
-            self.scheduled_scrape_job()
+            if self.adaptive_recrawl:
+                print("\n🚀 Dispatching due recrawl targets...")
+                self.dispatch_due_recrawls()
+            else:
+                print("\n🚀 Running initial scrape job...")
+                self.scheduled_scrape_job()
             
             # Start the scheduler
             self.scheduler.start()
@@ -220,9 +411,13 @@ class ScrapingScheduler:
         if self.running and self.scheduler.running:
             print("🛑 Shutting down scheduler...")
             self.scheduler.shutdown(wait=True)
+            if self.leader_lock:
+                # Let another replica take over right away
+                self.leader_lock.release()
             self.running = False
             print("✅ Scheduler stopped")
 
 if __name__ == "__main__":
+    configure_logging()
     scheduler = ScrapingScheduler()
     scheduler.start()
@@ -1,83 +1,215 @@
+import atexit
+import logging
 import smtplib
 import os
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+import queue
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+class SmtpSink:
+    """Delivers alerts by email"""
+
+    def __init__(self, host, port, to_address, username=None, password=None, from_address=None,
+                 use_tls=True, timeout=10):
+        self.host = host
+        self.port = port
+        self.to_address = to_address
+        self.username = username
+        self.password = password
+        self.from_address = from_address or username or 'scraper@localhost'
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send(self, alert):
+        msg = MIMEMultipart()
+        msg['From'] = self.from_address
+        msg['To'] = self.to_address
+        msg['Subject'] = f"[Amazon Scraper Alert] {alert['subject']}"
+
+        body = f"""
+        Alert Time: {datetime.fromtimestamp(alert['timestamp']).strftime('%Y-%m-%d %H:%M:%S')}
+        Severity: {alert['severity']}
+
+        {alert['message']}
+
+        Please check your scraper system.
+        """
+        msg.attach(MIMEText(body, 'plain'))
+
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as server:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+            server.send_message(msg)
+
+class WebhookSink:
+    """Delivers alerts to a chat webhook (Slack uses "text", Discord "content")"""
+
+    def __init__(self, url, payload_key='text', timeout=10):
+        self.url = url
+        self.payload_key = payload_key
+        self.timeout = timeout
+
+    def send(self, alert):
+        import requests
+        text = f"[{alert['severity'].upper()}] {alert['subject']}\n{alert['message']}"
+        requests.post(self.url, json={self.payload_key: text}, timeout=self.timeout).raise_for_status()
+
 class AlertManager:
-    def __init__(self):
+    """Deduplicated, rate-limited alerts delivered off the calling thread.
+
+    An alert with the same key is suppressed until the cooldown passes (or
+    the alert is resolved), and no more than `max_per_hour` alerts go out in
+    total, so an outage produces one alert instead of a flood. Delivery
+    happens on a background thread and never blocks the crawl.
+    """
+
+    def __init__(self, sinks=None, cooldown=None, max_per_hour=None):
         self.smtp_host = os.getenv('SMTP_HOST', 'smtp.gmail.com')
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.smtp_username = os.getenv('SMTP_USERNAME')
         self.smtp_password = os.getenv('SMTP_PASSWORD')
         self.alert_email = os.getenv('ALERT_EMAIL')
-        
-    def send_email_alert(self, subject, message):
-        """Send email alert"""
-        if not all([self.smtp_username, self.smtp_password, self.alert_email]):
-            print("Email configuration missing, skipping email alert")
-            return False
-            
-        try:
-            msg = MimeMultipart()
-            msg['From'] = self.smtp_username
-            msg['To'] = self.alert_email
-            msg['Subject'] = f"[Amazon Scraper Alert] {subject}"
-            
-            body = f"""
-            Alert Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-            
-            {message}
-            
-            Please check your scraper system.
-            """
-            
-            msg.attach(MimeText(body, 'plain'))
-            
-            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
-            server.send_message(msg)
-            server.quit()
-            
-            print(f"Alert sent: {subject}")
-            return True
-            
-        except Exception as e:
-            print(f"Failed to send email alert: {e}")
+
+        self.sinks = sinks if sinks is not None else self._sinks_from_env()
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv('ALERT_COOLDOWN_MINUTES', '30')) * 60
+        self.max_per_hour = max_per_hour or int(os.getenv('ALERT_MAX_PER_HOUR', '10'))
+        self.delivery_retries = int(os.getenv('ALERT_DELIVERY_RETRIES', '3'))
+
+        self._last_sent = {}
+        self._sent_times = []
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def _sinks_from_env(self):
+        sinks = []
+        if os.getenv('ENABLE_EMAIL_ALERTS', 'true').lower() == 'true' and self.alert_email:
+            sinks.append(SmtpSink(
+                self.smtp_host, self.smtp_port, self.alert_email,
+                username=self.smtp_username, password=self.smtp_password,
+                use_tls=os.getenv('SMTP_USE_TLS', 'true').lower() == 'true'
+            ))
+        if os.getenv('ENABLE_SLACK_NOTIFICATIONS', 'false').lower() == 'true' and os.getenv('SLACK_WEBHOOK_URL'):
+            sinks.append(WebhookSink(os.getenv('SLACK_WEBHOOK_URL'), payload_key='text'))
+        if os.getenv('ENABLE_DISCORD_NOTIFICATIONS', 'false').lower() == 'true' and os.getenv('DISCORD_WEBHOOK_URL'):
+            sinks.append(WebhookSink(os.getenv('DISCORD_WEBHOOK_URL'), payload_key='content'))
+        return sinks
+
+    def send_alert(self, key, subject, message, severity='warning'):
+        """Queue an alert unless it is a duplicate or over the rate limit.
+
+        Returns True if the alert was queued for delivery.
+        """
+        now = time.time()
+        with self._lock:
+            last = self._last_sent.get(key)
+            if last is not None and now - last < self.cooldown:
+                return False
+
+            self._sent_times = [t for t in self._sent_times if now - t < 3600]
+            if len(self._sent_times) >= self.max_per_hour:
+                logger.warning("Alert rate limit reached, dropping alert: %s", subject)
+                return False
+
+            self._last_sent[key] = now
+            self._sent_times.append(now)
+
+        if not self.sinks:
+            logger.info("No alert sinks configured, skipping alert: %s", subject)
             return False
-    
+
+        self._ensure_thread()
+        self._queue.put({'key': key, 'subject': subject, 'message': message,
+                         'severity': severity, 'timestamp': now})
+        return True
+
+    def resolve(self, key, subject=None, message=None):
+        """Clear an alert so it fires again next time; optionally announce recovery"""
+        with self._lock:
+            was_firing = self._last_sent.pop(key, None) is not None
+        if was_firing and subject:
+            self._ensure_thread()
+            self._queue.put({'key': key, 'subject': subject, 'message': message or '',
+                             'severity': 'resolved', 'timestamp': time.time()})
+
+    def send_email_alert(self, subject, message):
+        """Send an alert keyed by its subject"""
+        return self.send_alert(subject, subject, message)
+
+    def _ensure_thread(self):
+        # Started lazily so each worker process gets its own delivery thread
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._deliver_loop, name='alert-delivery', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush, 10)
+
+    def _deliver_loop(self):
+        while True:
+            alert = self._queue.get()
+            try:
+                self._deliver(alert)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, alert):
+        for sink in self.sinks:
+            for attempt in range(1, self.delivery_retries + 1):
+                try:
+                    sink.send(alert)
+                    logger.info("Alert sent via %s: %s", type(sink).__name__, alert['subject'])
+                    break
+                except Exception as e:
+                    logger.warning("Failed to send alert via %s (attempt %d): %s", type(sink).__name__, attempt, e)
+                    time.sleep(min(30, 2 ** attempt))
+
+    def flush(self, timeout=30):
+        """Wait for queued alerts to be delivered"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+        return not self._queue.unfinished_tasks
+
     def check_scraper_health(self, db_manager):
         """Check scraper health and send alerts if needed"""
         try:
             # Check recent scraping activity
             session = db_manager.get_session()
             from sqlalchemy import text
-            
+
             # Count products scraped in last hour
             recent_products = session.execute(text("""
-                SELECT COUNT(*) as count 
-                FROM products 
+                SELECT COUNT(*) as count
+                FROM products
                 WHERE scraped_at > NOW() - INTERVAL '1 hour'
             """)).fetchone()
-            
-            # Count failed requests (you'd need to add a failures table)
-            # For now, we'll simulate this check
-            
+
             if recent_products.count == 0:
-                self.send_email_alert(
+                self.send_alert(
+                    'no_recent_activity',
                     "No Recent Scraping Activity",
                     "No products have been scraped in the last hour. Please check the scraper."
                 )
-            
+            else:
+                self.resolve('no_recent_activity')
+
             session.close()
-            
+
         except Exception as e:
-            self.send_email_alert(
-                "Scraper Health Check Failed", 
+            self.send_alert(
+                'health_check_failed',
+                "Scraper Health Check Failed",
                 f"Failed to check scraper health: {str(e)}"
             )
 
@@ -0,0 +1,204 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.config
+import os
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from dotenv import load_dotenv
+from monitoring.tracing import tracer
+
+load_dotenv()
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'logging.conf')
+CONTEXT_FIELDS = ('job_id', 'category', 'page', 'trace_id')
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s [job=%(job_id)s category=%(category)s page=%(page)s] %(message)s'
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'verbose'}
+
+_log_context = contextvars.ContextVar('log_context', default={})
+_listener = None
+_configured_pid = None
+_lock = threading.Lock()
+
+@contextmanager
+def log_context(**fields):
+    """Add fields (page, verbose, ...) to every log record in this block.
+
+    job_id and category already come from the current tracing span.
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+def verbose_enabled():
+    """Whether the current job asked for verbose debug output"""
+    return bool(_log_context.get().get('verbose'))
+
+def debug_enabled(logger):
+    """Cheap check before building expensive debug output"""
+    return logger.isEnabledFor(logging.DEBUG) or verbose_enabled()
+
+def log_debug(logger, msg, *args):
+    """Debug message that a verbose job emits whatever the configured level.
+
+    Use this instead of logger.debug on the crawl path: a plain debug call
+    is dropped by the level check before any filter sees it. Other jobs pay
+    only that check, so turning on verbose output for one job doesn't slow
+    the rest down.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args, stacklevel=2)
+    elif verbose_enabled():
+        fn, lno, func, _ = logger.findCaller(stacklevel=2)
+        logger.handle(logger.makeRecord(logger.name, logging.DEBUG, fn, lno, msg, args, None, func))
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the job, category, page and trace they belong to.
+
+    Runs in the thread that logs, before the record is queued, so the
+    context variables are still visible.
+    """
+
+    def filter(self, record):
+        context = _log_context.get()
+        span = tracer.current_span()
+        attributes = span.attributes if span else {}
+        record.job_id = context.get('job_id', attributes.get('job_id'))
+        record.category = context.get('category', attributes.get('category'))
+        record.page = context.get('page', attributes.get('page'))
+        record.trace_id = span.trace_id if span else None
+        record.verbose = bool(context.get('verbose'))
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in every 1/rate debug records per message template.
+
+    Records from verbose jobs and anything above DEBUG always pass.
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or getattr(record, 'verbose', False):
+            return True
+        if not self.every:
+            return False
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with the context fields and any `extra` values"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in CONTEXT_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without formatting or blocking.
+
+    The message is formatted on the listener thread, so pass immutable
+    values as arguments. When the queue is full records are dropped rather
+    than stalling the crawl.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Render the traceback now, while it still exists
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def configure_logging(config_path=None):
+    """Set up logging from config/logging.conf behind a background queue.
+
+    The handlers defined in the config file become the sinks of a
+    QueueListener; the root logger only gets a queue handler, so logging
+    never blocks on stdout or disk. Safe to call more than once per process;
+    a forked child, which inherits the queue but not the listener thread,
+    gets its own.
+    """
+    global _listener, _configured_pid
+    with _lock:
+        if _configured_pid == os.getpid():
+            return
+        path = config_path or os.getenv('LOG_CONFIG', DEFAULT_CONFIG)
+        level = os.getenv('LOG_LEVEL', 'INFO').upper()
+        use_json = os.getenv('LOG_JSON', 'true').lower() == 'true'
+        if os.path.exists(path):
+            logging.config.fileConfig(path, disable_existing_loggers=False, defaults={
+                'log_level': level,
+                'log_formatter': 'json' if use_json else 'text',
+            })
+        else:
+            # Same output as the default config when the file isn't shipped
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(JSONFormatter() if use_json else logging.Formatter(TEXT_FORMAT))
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(console)
+            root.setLevel(level)
+
+        root = logging.getLogger()
+        sinks = list(root.handlers)
+        for handler in sinks:
+            root.removeHandler(handler)
+
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000'))))
+        handler.addFilter(ContextFilter())
+        handler.addFilter(SamplingFilter(float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0.1'))))
+        root.addHandler(handler)
+
+        _listener = QueueListener(handler.queue, *sinks, respect_handler_level=True)
+        _listener.start()
+        _configured_pid = os.getpid()
+        atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Write out everything still queued and stop the listener thread"""
+    global _listener, _configured_pid
+    with _lock:
+        if _listener is None or _configured_pid != os.getpid():
+            return
+        _listener.stop()
+        _listener = _configured_pid = None
@@ -1,47 +1,99 @@
-from prometheus_client import Counter, Histogram, Gauge, start_http_server
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, start_http_server
+from prometheus_client import multiprocess
+import logging
+import os
 import time
-import threading
+from contextlib import contextmanager
 from functools import wraps
+from monitoring.tracing import tracer
+from monitoring.multiprocess import multiprocess_enabled
+
+logger = logging.getLogger(__name__)
 
 # Define metrics
 REQUESTS_TOTAL = Counter('scraper_requests_total', 'Total scraper requests', ['status', 'category'])
 REQUEST_DURATION = Histogram('scraper_request_duration_seconds', 'Request duration')
 PRODUCTS_SCRAPED = Counter('products_scraped_total', 'Total products scraped', ['category'])
-ACTIVE_PROXIES = Gauge('active_proxies_count', 'Number of active proxies')
+# Gauge modes only matter in multiprocess mode: how per-process values
+# combine into the pod total
+ACTIVE_PROXIES = Gauge('active_proxies_count', 'Number of active proxies', multiprocess_mode='livemax')
 SCRAPER_ERRORS = Counter('scraper_errors_total', 'Total scraper errors', ['error_type'])
 DATABASE_OPERATIONS = Counter('database_operations_total', 'Database operations', ['operation'])
+QUEUE_DEPTH = Gauge('scraper_queue_depth', 'Jobs waiting in the scraping queue', multiprocess_mode='livemax')
+ACTIVE_WORKERS = Gauge('scraper_active_workers', 'Worker processes run by the supervisor', multiprocess_mode='livemax')
+WORKER_THROUGHPUT = Gauge('scraper_worker_throughput_jobs_per_second', 'Jobs finished per second across workers',
+                          multiprocess_mode='livemax')
+WORKER_RESTARTS = Counter('scraper_worker_restarts_total', 'Crashed worker processes restarted')
+RATE_LIMIT_WAIT = Histogram('scraper_rate_limit_wait_seconds', 'Time spent waiting for a rate limit token', ['host'],
+                            buckets=(0, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120))
+RATE_LIMIT_TOKENS = Counter('scraper_rate_limit_tokens_total', 'Rate limit token requests', ['host', 'outcome'])
+PAGES_SKIPPED = Counter('scraper_pages_skipped_total', 'Page fetches skipped by early-stop pagination', ['reason'])
+FRONTIER_URLS = Counter('frontier_urls_total', 'URLs offered to the frontier by outcome', ['outcome'])
+STAGE_DURATION = Histogram('scraper_stage_duration_seconds', 'Time spent in each pipeline stage', ['stage'],
+                           buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
 
 class MetricsCollector:
-    def __init__(self, port=8000):
-        self.port = port
+    def __init__(self, port=None):
+        self.port = port or int(os.getenv('PROMETHEUS_PORT', '8000'))
         self.server_started = False
-        self.server_thread = None
+        self._listeners = []
+    
+    def add_listener(self, listener):
+        """Call `listener(event, **fields)` for fetches, pages and stage timings.
+
+        Lets in-process consumers such as the SLO evaluator see the same
+        events the Prometheus metrics are built from.
+        """
+        self._listeners.append(listener)
+    
+    def _notify(self, event, **fields):
+        for listener in self._listeners:
+            try:
+                listener(event, **fields)
+            except Exception as e:
+                logger.warning("Metrics listener failed on %s: %s", event, e)
     
     def start_metrics_server(self):
-        """Start Prometheus metrics server in a separate thread"""
-        if not self.server_started:
-            def run_server():
-                try:
-                    start_http_server(self.port)
-                    print(f"Prometheus metrics server started on http://localhost:{self.port}/metrics")
-                except Exception as e:
-                    print(f"Failed to start metrics server: {e}")
-            
-            self.server_thread = threading.Thread(target=run_server, daemon=True)
-            self.server_thread.start()
-            self.server_started = True
-            
-            # Wait a moment for server to start
-            time.sleep(1)
-            print(f"Metrics accessible at: http://localhost:{self.port}/metrics")
+        """Start the Prometheus metrics server on a daemon thread.
+
+        Returns immediately. In multiprocess mode the endpoint serves the
+        totals of every worker process. If the port is already taken (e.g.
+        another process serves it) this logs and carries on.
+        """
+        if self.server_started:
+            return True
+        
+        registry = None
+        if multiprocess_enabled():
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        
+        try:
+            if registry is not None:
+                start_http_server(self.port, registry=registry)
+            else:
+                start_http_server(self.port)
+        except OSError as e:
+            logger.warning("Metrics server not started on port %d: %s", self.port, e)
+            return False
+        
+        self.server_started = True
+        logger.info("Prometheus metrics server started on http://localhost:%d/metrics", self.port)
+        return True
     
     def record_request(self, status, category='unknown'):
         """Record a scraper request"""
         REQUESTS_TOTAL.labels(status=status, category=category).inc()
     
+    def record_fetch(self, outcome, category='unknown'):
+        """Record a page fetch attempt: success, failed or blocked"""
+        REQUESTS_TOTAL.labels(status=outcome, category=category).inc()
+        self._notify('fetch', outcome=outcome, category=category)
+    
     def record_products_scraped(self, count, category='unknown'):
-        """Record number of products scraped"""
+        """Record the products parsed from one page"""
         PRODUCTS_SCRAPED.labels(category=category).inc(count)
+        self._notify('page', products=count, category=category)
     
     def record_error(self, error_type):
         """Record an error"""
@@ -51,22 +103,67 @@ class MetricsCollector:
         """Record database operation"""
         DATABASE_OPERATIONS.labels(operation=operation).inc()
     
+    def record_pages_skipped(self, reason, count=1):
+        """Record page fetches saved by early-stop pagination"""
+        PAGES_SKIPPED.labels(reason=reason).inc(count)
+    
+    def record_frontier_url(self, outcome):
+        """Record a frontier admission or duplicate suppression"""
+        FRONTIER_URLS.labels(outcome=outcome).inc()
+    
+    def update_queue_depth(self, depth):
+        """Update the queue depth the deployment scales on"""
+        QUEUE_DEPTH.set(depth)
+    
+    def update_workers(self, count, throughput):
+        """Update supervisor worker count and recent throughput"""
+        ACTIVE_WORKERS.set(count)
+        WORKER_THROUGHPUT.set(throughput)
+    
+    def record_worker_restart(self):
+        """Record a crashed worker being restarted"""
+        WORKER_RESTARTS.inc()
+    
+    def record_rate_limit(self, host, outcome, wait):
+        """Record a rate limit token request and how long it waited"""
+        RATE_LIMIT_TOKENS.labels(host=host, outcome=outcome).inc()
+        if outcome == 'granted':
+            RATE_LIMIT_WAIT.labels(host=host).observe(wait)
+    
     def update_active_proxies(self, count):
         """Update active proxy count"""
         ACTIVE_PROXIES.set(count)
     
+    @contextmanager
+    def stage(self, name, **attributes):
+        """Time a pipeline stage into the stage histogram and record a span.
+
+        Spans nest, so a stage inside a job carries that job's ID.
+        """
+        start_time = time.time()
+        try:
+            with tracer.span(name, **attributes) as span:
+                yield span
+        finally:
+            duration = time.time() - start_time
+            STAGE_DURATION.labels(stage=name).observe(duration)
+            self._notify('stage', stage=name, duration=duration)
+    
+    @contextmanager
+    def request_timer(self):
+        """Observe the time spent in the block as one request duration"""
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            REQUEST_DURATION.observe(time.time() - start_time)
+    
     def time_request(self, func):
         """Decorator to time function execution"""
         @wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = time.time()
-            try:
-                result = func(*args, **kwargs)
-                REQUEST_DURATION.observe(time.time() - start_time)
-                return result
-            except Exception as e:
-                REQUEST_DURATION.observe(time.time() - start_time)
-                raise
+            with self.request_timer():
+                return func(*args, **kwargs)
         return wrapper
 
 # Global metrics instance
@@ -0,0 +1,39 @@
+import os
+import shutil
+
+# prometheus_client picks single- or multi-process storage when it is first
+# imported, so this module must not import it at module level.
+MULTIPROC_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+DEFAULT_DIR = '/tmp/scraper_metrics'
+
+def multiprocess_enabled():
+    """Whether metrics are shared across worker processes"""
+    return bool(os.getenv(MULTIPROC_ENV))
+
+def prepare_multiprocess_dir(path=None):
+    """Enable multiprocess metrics with a fresh registry directory.
+
+    Call in the parent process before monitoring.metrics is imported and
+    before any worker starts; workers inherit the directory through the
+    environment. Files left by a previous run are removed so their values
+    don't leak into this one.
+    """
+    path = path or os.getenv(MULTIPROC_ENV) or DEFAULT_DIR
+    if os.path.isdir(path):
+        for name in os.listdir(path):
+            file_path = os.path.join(path, name)
+            if os.path.isdir(file_path):
+                shutil.rmtree(file_path, ignore_errors=True)
+            else:
+                os.remove(file_path)
+    else:
+        os.makedirs(path, exist_ok=True)
+    os.environ[MULTIPROC_ENV] = path
+    return path
+
+def mark_worker_dead(pid):
+    """Drop a dead worker's live gauges from the pod totals"""
+    if not multiprocess_enabled():
+        return
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(pid)
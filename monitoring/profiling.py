@@ -0,0 +1,111 @@
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_active_profiler = contextvars.ContextVar('active_profiler', default=None)
+
+def profiling_enabled():
+    """SCRAPER_PROFILE=true profiles every job run by this process"""
+    return os.getenv('SCRAPER_PROFILE', 'false').lower() in ('1', 'true', 'yes')
+
+def snapshot(label):
+    """Take a memory snapshot on the active profiler, if any"""
+    profiler = _active_profiler.get()
+    if profiler is not None:
+        profiler.snapshot(label)
+
+class JobProfiler:
+    """Opt-in CPU profile and tracemalloc snapshots for a single job.
+
+    Writes <job_id>-<pid>.prof (load with pstats or snakeviz) and a
+    <job_id>-<pid>.txt summary of the top hot spots and allocation growth
+    between snapshots to PROFILE_DIR, and logs the summary. Disabled
+    profilers cost nothing; nested ones defer to the outer profiler.
+    """
+
+    def __init__(self, job_id, enabled=False, output_dir=None, top_n=None):
+        self.job_id = str(job_id).replace('/', '_').replace(':', '_')
+        self.enabled = enabled or profiling_enabled()
+        self.output_dir = output_dir or os.getenv('PROFILE_DIR', 'profiles')
+        self.top_n = top_n or int(os.getenv('PROFILE_TOP_N', '15'))
+        self.snapshots = []
+        self.summary = None
+        self._profile = None
+        self._token = None
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        if not self.enabled or _active_profiler.get() is not None:
+            self.enabled = False
+            return self
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', '10')))
+            self._started_tracemalloc = True
+        self._token = _active_profiler.set(self)
+        self.snapshot('start')
+
+        self._start_time = time.time()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.enabled:
+            return False
+
+        self._profile.disable()
+        self.snapshot('end')
+        _active_profiler.reset(self._token)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        try:
+            self._write_results(time.time() - self._start_time)
+        except Exception as e:
+            logger.warning("Failed to write profile for job %s: %s", self.job_id, e)
+        return False
+
+    def snapshot(self, label):
+        """Record a tracemalloc snapshot labelled with the pipeline point"""
+        if self.enabled and tracemalloc.is_tracing():
+            self.snapshots.append((label, tracemalloc.take_snapshot()))
+
+    def _write_results(self, duration):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.job_id}-{os.getpid()}")
+        self._profile.dump_stats(base + '.prof')
+
+        out = io.StringIO()
+        out.write(f"Profile for job {self.job_id} ({duration:.2f}s)\n\n")
+        out.write(f"Top {self.top_n} functions by cumulative time:\n")
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+
+        # Allocation growth between consecutive snapshots
+        for (prev_label, prev), (label, current) in zip(self.snapshots, self.snapshots[1:]):
+            diff = current.compare_to(prev, 'lineno')
+            total = sum(stat.size_diff for stat in diff)
+            out.write(f"\nMemory {prev_label} -> {label}: {total / 1024:+.1f} KiB\n")
+            for stat in diff[:self.top_n]:
+                out.write(f"  {stat}\n")
+
+        self.summary = out.getvalue()
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            f.write(self.summary)
+
+        hot_spots = stats.sort_stats('tottime').get_stats_profile().func_profiles
+        top = sorted(hot_spots.items(), key=lambda item: item[1].tottime, reverse=True)[:5]
+        lines = [f"  {profile.tottime:8.3f}s self {profile.cumtime:8.3f}s cum  {name} "
+                 f"({os.path.basename(profile.file_name)}:{profile.line_number})" for name, profile in top]
+        logger.info("Profile for job %s written to %s.prof; top hot spots:\n%s", self.job_id, base, '\n'.join(lines))
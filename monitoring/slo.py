@@ -0,0 +1,159 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+from monitoring.alerts import alert_manager as default_alert_manager
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Rank is ceil(pct% of n); round() would go to the even rank on .5
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class SLOEvaluator:
+    """Checks crawl health against service level objectives over a rolling window.
+
+    Fed by MetricsCollector events: fetch outcomes give the success and
+    block rates, parsed pages give products per page and stage timings give
+    latency percentiles. Every `interval` seconds each objective with enough
+    samples is evaluated; a breach raises a deduplicated alert and recovery
+    resolves it.
+    """
+
+    def __init__(self, alert_manager=None, window=None, interval=None):
+        self.alert_manager = alert_manager or default_alert_manager
+        self.window = window or float(os.getenv('SLO_WINDOW_SECONDS', '900'))
+        self.interval = interval or float(os.getenv('SLO_EVAL_INTERVAL', '60'))
+        self.min_samples = int(os.getenv('SLO_MIN_SAMPLES', '20'))
+        self.latency_stage = os.getenv('SLO_LATENCY_STAGE', 'navigation')
+        # name -> (direction, threshold)
+        self.objectives = {
+            'success_rate': ('min', float(os.getenv('SLO_MIN_SUCCESS_RATE', os.getenv('MIN_SUCCESS_RATE', '0.9')))),
+            'block_rate': ('max', float(os.getenv('SLO_MAX_BLOCK_RATE', '0.1'))),
+            'products_per_page': ('min', float(os.getenv('SLO_MIN_PRODUCTS_PER_PAGE', '10'))),
+            'latency_p95': ('max', float(os.getenv('SLO_MAX_LATENCY_P95_SECONDS', '30'))),
+        }
+
+        max_samples = int(os.getenv('SLO_MAX_SAMPLES', '10000'))
+        self._fetches = deque(maxlen=max_samples)  # (timestamp, outcome)
+        self._pages = deque(maxlen=max_samples)  # (timestamp, products)
+        self._stages = {}  # stage -> deque of (timestamp, duration)
+        self._max_samples = max_samples
+        self._lock = threading.Lock()
+        self._thread = None
+        self._subscribed = False
+        self._stop = threading.Event()
+
+    def observe(self, event, **fields):
+        """MetricsCollector listener"""
+        now = time.time()
+        with self._lock:
+            if event == 'fetch':
+                self._fetches.append((now, fields['outcome']))
+            elif event == 'page':
+                self._pages.append((now, fields['products']))
+            elif event == 'stage':
+                samples = self._stages.setdefault(fields['stage'], deque(maxlen=self._max_samples))
+                samples.append((now, fields['duration']))
+
+    def _recent(self, samples, now):
+        while samples and samples[0][0] < now - self.window:
+            samples.popleft()
+        return [value for _, value in samples]
+
+    def snapshot(self, now=None):
+        """Current values over the window; rates are None without samples"""
+        now = now or time.time()
+        with self._lock:
+            fetches = self._recent(self._fetches, now)
+            pages = self._recent(self._pages, now)
+            stages = {stage: self._recent(samples, now) for stage, samples in self._stages.items()}
+
+        latency = {
+            stage: {
+                'count': len(durations),
+                'p50': percentile(durations, 50),
+                'p95': percentile(durations, 95),
+                'p99': percentile(durations, 99),
+            }
+            for stage, durations in stages.items() if durations
+        }
+        return {
+            'window': self.window,
+            'fetches': len(fetches),
+            'pages': len(pages),
+            'success_rate': fetches.count('success') / len(fetches) if fetches else None,
+            'block_rate': fetches.count('blocked') / len(fetches) if fetches else None,
+            'products_per_page': sum(pages) / len(pages) if pages else None,
+            'latency': latency,
+        }
+
+    def _measurements(self, snapshot):
+        """name -> (value, sample count) for each objective"""
+        stage = snapshot['latency'].get(self.latency_stage, {})
+        return {
+            'success_rate': (snapshot['success_rate'], snapshot['fetches']),
+            'block_rate': (snapshot['block_rate'], snapshot['fetches']),
+            'products_per_page': (snapshot['products_per_page'], snapshot['pages']),
+            'latency_p95': (stage.get('p95'), stage.get('count', 0)),
+        }
+
+    def evaluate(self, now=None):
+        """Alert on breached objectives and resolve recovered ones.
+
+        Returns the names of the objectives currently breached.
+        """
+        snapshot = self.snapshot(now)
+        breached = []
+        for name, (value, samples) in self._measurements(snapshot).items():
+            # Too few samples to judge either way; leave any alert as it is
+            if value is None or samples < self.min_samples:
+                continue
+
+            direction, threshold = self.objectives[name]
+            ok = value >= threshold if direction == 'min' else value <= threshold
+            key = f"slo:{name}"
+            description = (f"{name} is {value:.3f} (objective {direction} {threshold}) over the last "
+                           f"{self.window / 60:.0f} minutes, {samples} samples")
+            if ok:
+                self.alert_manager.resolve(key, f"SLO recovered: {name}", description)
+                continue
+
+            breached.append(name)
+            self.alert_manager.send_alert(key, f"SLO breached: {name}", description)
+        return breached
+
+    def start(self):
+        """Subscribe to metrics events and evaluate on a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if not self._subscribed:
+            from monitoring.metrics import metrics
+            metrics.add_listener(self.observe)
+            self._subscribed = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='slo-evaluator', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.evaluate()
+            except Exception as e:
+                logger.exception("SLO evaluation failed")
+
+# Global evaluator instance
+slo_evaluator = SLOEvaluator()
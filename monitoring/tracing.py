@@ -0,0 +1,222 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+# Queued to tell the exporter thread to finish its batch and exit
+_STOP = object()
+
+class Span:
+    """A timed unit of work; children inherit the trace and job ID"""
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(parent.inherited_attributes()) if parent else {}
+        self.attributes.update({k: v for k, v in (attributes or {}).items() if v is not None})
+        self.start_time = time.time()
+        self.end_time = None
+        self.error = None
+
+    def inherited_attributes(self):
+        return {k: v for k, v in self.attributes.items() if k in ('job_id', 'category')}
+
+    @property
+    def duration(self):
+        return (self.end_time or time.time()) - self.start_time
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'duration': self.duration,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+class FileSpanExporter:
+    """Appends finished spans to a local file as JSON lines"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + '\n')
+
+class OTLPSpanExporter:
+    """Sends spans to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint, service_name='amazon-scraper', timeout=5):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _attribute(key, value):
+        if isinstance(value, bool):
+            return {'key': key, 'value': {'boolValue': value}}
+        if isinstance(value, int):
+            return {'key': key, 'value': {'intValue': str(value)}}
+        if isinstance(value, float):
+            return {'key': key, 'value': {'doubleValue': value}}
+        return {'key': key, 'value': {'stringValue': str(value)}}
+
+    def _encode(self, span):
+        encoded = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': 1,
+            'startTimeUnixNano': str(int(span.start_time * 1e9)),
+            'endTimeUnixNano': str(int(span.end_time * 1e9)),
+            'attributes': [self._attribute(k, v) for k, v in span.attributes.items()],
+            'status': {'code': 2, 'message': span.error} if span.error else {'code': 1},
+        }
+        if span.parent_id:
+            encoded['parentSpanId'] = span.parent_id
+        return encoded
+
+    def export(self, spans):
+        import requests
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': [self._attribute('service.name', self.service_name)]},
+            'scopeSpans': [{'scope': {'name': 'scraper'}, 'spans': [self._encode(s) for s in spans]}],
+        }]}
+        requests.post(self.url, json=payload, timeout=self.timeout).raise_for_status()
+
+class Tracer:
+    """Records spans and hands them to an exporter from a background thread,
+    so exporting never slows down the crawl path"""
+
+    def __init__(self, exporter=None, batch_size=100, flush_interval=5.0):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    @classmethod
+    def from_env(cls):
+        """Build a tracer from TRACE_EXPORTER=none|file|otlp"""
+        kind = os.getenv('TRACE_EXPORTER', 'none').lower()
+        if kind == 'file':
+            exporter = FileSpanExporter(os.getenv('TRACE_FILE', 'traces.jsonl'))
+        elif kind == 'otlp':
+            exporter = OTLPSpanExporter(os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318'),
+                                        service_name=os.getenv('OTEL_SERVICE_NAME', 'amazon-scraper'))
+        else:
+            exporter = None
+        return cls(exporter, flush_interval=float(os.getenv('TRACE_FLUSH_INTERVAL', '5')))
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a block of work as a child of the current span"""
+        span = Span(name, parent=_current_span.get(), attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_time = time.time()
+            _current_span.reset(token)
+            self._record(span)
+
+    def current_span(self):
+        return _current_span.get()
+
+    def _record(self, span):
+        if self.exporter is None:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass  # Drop spans rather than block the crawl
+
+    def _ensure_thread(self):
+        # Started lazily so each worker process gets its own exporter thread
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+                    self._thread.start()
+                    # The thread is restarted after a fork; the hook is needed only once
+                    if not self._atexit_registered:
+                        atexit.register(self.shutdown)
+                        self._atexit_registered = True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            span = self._queue.get()
+            deadline = time.time() + self.flush_interval
+            while True:
+                if span is _STOP:
+                    stopping = True
+                    break
+                batch.append(span)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    span = self._queue.get(timeout=max(0, deadline - time.time()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._export(batch)
+
+    def _export(self, spans):
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            logger.warning("Failed to export %d spans: %s", len(spans), e)
+
+    def flush(self):
+        """Export whatever is still queued"""
+        spans = []
+        while True:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        spans = [span for span in spans if span is not _STOP]
+        if spans and self.exporter is not None:
+            self._export(spans)
+
+    def shutdown(self, timeout=5.0):
+        """Let the exporter thread send the batch it is holding, then export the rest"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                thread.join(timeout)
+            except queue.Full:
+                pass
+        self.flush()
+
+# Global tracer instance
+tracer = Tracer.from_env()
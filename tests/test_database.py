@@ -0,0 +1,44 @@
+"""DatabaseManager against a throwaway SQLite database."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_pipeline.database import DatabaseManager
+
+def search_result(asin, qid, price):
+    return {
+        'name': f"Product {asin}",
+        'url': f"/Some-Product/dp/{asin}/ref=sr_1_1?dib=eyJ2{qid}&qid={qid}&sr=8-1",
+        'price': price,
+        'rating': '4.2',
+        'num_reviews': '120',
+    }
+
+@pytest.fixture
+def db_manager(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    db_manager = DatabaseManager()
+    db_manager.cache = None
+    db_manager.create_tables()
+    return db_manager
+
+def test_stored_prices_match_across_crawls_with_different_tracking_params(db_manager):
+    first_crawl = [search_result('B000000001', 1700000000, '₹1,299'),
+                   search_result('B000000002', 1700000000, '₹2,499')]
+    db_manager.save_products(first_crawl, category='laptops')
+
+    second_crawl = [search_result('B000000001', 1700003600, '₹1,299'),
+                    search_result('B000000002', 1700003600, '₹2,199')]
+    stored = db_manager.get_stored_prices([product['url'] for product in second_crawl])
+
+    assert stored == {second_crawl[0]['url']: '₹1,299', second_crawl[1]['url']: '₹2,499'}
+
+def test_stored_prices_without_asin_match_exactly(db_manager):
+    product = dict(search_result('B000000001', 1, '₹99'), url='https://www.amazon.in/deal/123')
+    db_manager.save_products([product], category='deals')
+
+    assert db_manager.get_stored_prices([product['url'], 'https://www.amazon.in/deal/456']) == \
+        {product['url']: '₹99'}
@@ -0,0 +1,17 @@
+"""Percentiles used by the SLO evaluator and the benchmarks."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring.slo import percentile
+
+def test_percentile_uses_nearest_rank_with_odd_sample_count():
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 50) == 3
+    assert percentile(values, 90) == 5
+    assert percentile(values, 10) == 1
+    assert percentile(values, 100) == 5
+
+def test_percentile_of_empty_list_is_none():
+    assert percentile([], 95) is None
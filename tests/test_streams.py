@@ -0,0 +1,49 @@
+"""Stream queue backend against a local Redis (docker-compose up redis).
+
+Uses REDIS_URL (default redis://localhost:6379) and database 15; skipped
+when no Redis is reachable.
+"""
+import os
+import sys
+import uuid
+
+import pytest
+import redis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_pipeline.streams import StreamQueueBackend
+
+@pytest.fixture
+def redis_client():
+    client = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379'), db=15)
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        pytest.skip("no local Redis")
+    yield client
+    client.close()
+
+@pytest.fixture
+def streams(redis_client):
+    name = f"test:jobs:{uuid.uuid4().hex}"
+    yield name, f"{name}:results"
+    redis_client.delete(name, f"{name}:results")
+
+def test_pop_after_another_process_cleared_the_stream(redis_client, streams):
+    stream, results = streams
+    # Two backends stand in for two worker processes
+    first = StreamQueueBackend(redis_client, stream, results, group='workers', consumer='first')
+    second = StreamQueueBackend(redis_client, stream, results, group='workers', consumer='second')
+
+    first.push_jobs([b'a'])
+    assert [payload for _, payload in second.pop_jobs(timeout=0.1)] == [b'a']
+
+    # Deletes the stream and group; `second` still believes its group exists
+    first.clear()
+    first.push_jobs([b'b'])
+
+    jobs = second.pop_jobs(timeout=0.1)
+    assert [payload for _, payload in jobs] == [b'b']
+    second.ack([msg_id for msg_id, _ in jobs])
+    assert second.size() == 0